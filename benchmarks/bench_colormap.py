@@ -0,0 +1,48 @@
+"""
+compare the memoized xterm color lookup against the original linear scan
+
+    python -m benchmarks.bench_colormap
+"""
+
+import random
+import timeit
+
+from consolemd.colormap import closest_color, color_index, _scan_closest
+
+
+def main(number=20000):
+    rand = random.Random(1234)
+
+    # a rendered document only uses a handful of distinct colors
+    colors = ["#{:06x}".format(rand.randrange(0xffffff)) for _ in range(32)]
+    rgbs = [tuple(int(c[i:i+2], 16) for i in (1, 3, 5)) for c in colors]
+
+    def scan():
+        for r, g, b in rgbs:
+            _scan_closest(r, g, b)
+
+    def cached():
+        for r, g, b in rgbs:
+            closest_color(r, g, b)
+
+    def by_name():
+        for c in colors:
+            color_index(c)
+
+    results = [
+        ('linear scan', timeit.timeit(scan, number=number // 100) * 100),
+        ('closest_color', timeit.timeit(cached, number=number)),
+        ('color_index', timeit.timeit(by_name, number=number)),
+    ]
+
+    lookups = number * len(colors)
+    base = results[0][1]
+
+    for name, secs in results:
+        print("{:<15} {:>10.1f} ns/lookup {:>10.1f}x".format(
+            name, secs / lookups * 1e9, base / secs
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+measure the peak memory of rendering ever bigger documents
+
+    python -m benchmarks.bench_memory                 # 4, 16 and 64 MB
+    python -m benchmarks.bench_memory --sizes 16 256  # in MB
+
+every size is rendered by a fresh `consolemd` process, with and without
+--stream, and its peak RSS reported. With --stream memory should stay
+flat no matter how big the input gets, without it it grows with the
+input since the whole document is parsed before anything is rendered.
+"""
+
+import os
+import sys
+import random
+import tempfile
+import argparse
+import subprocess
+
+from .corpus import prose, lists, links, code, nested
+
+# run the command in a child and print the child's peak rss in KB, the
+# extra process keeps every measurement separate (ru_maxrss of
+# RUSAGE_CHILDREN is the max over every child ever waited for)
+measure = """\
+import sys, resource, subprocess
+subprocess.run(sys.argv[1:], check=True)
+print(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+"""
+
+
+def unit():
+    """
+    about 1MB of everything, repeated to make documents of any size
+    """
+    rand = random.Random(0x636d64)
+    generators = [prose, lists, links, code, nested]
+
+    out = []
+    total = 0
+    while total < 1024 * 1024:
+        text = generators[len(out) % len(generators)](rand)
+        out.append(text)
+        total += len(text)
+
+    return '\n'.join(out) + '\n'
+
+
+def make_document(path, size):
+    text = unit()
+
+    with open(path, 'w', encoding='utf-8') as fh:
+        for _ in range(max(1, round(size / len(text)))):
+            fh.write(text)
+
+
+def peak_rss(path, *options):
+    cmd = [sys.executable, '-m', 'consolemd.cli', '-o', os.devnull] + list(options) + [path]
+    out = subprocess.run(
+        [sys.executable, '-c', measure] + cmd,
+        check=True, stdout=subprocess.PIPE, universal_newlines=True,
+    ).stdout
+
+    return int(out.split()[-1]) / 1024.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 16, 64],
+            help="document sizes in MB (def: 4 16 64)")
+    args = parser.parse_args(argv)
+
+    header = "{:>8} {:>10} {:>14}".format('MB', 'RSS MB', 'RSS MB stream')
+    print(header)
+    print('-' * len(header))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'doc.md')
+
+        for size in args.sizes:
+            make_document(path, size * 1024 * 1024)
+
+            print("{:>8.1f} {:>10.1f} {:>14.1f}".format(
+                os.path.getsize(path) / (1024.0 * 1024.0),
+                peak_rss(path),
+                peak_rss(path, '--stream'),
+            ))
+            sys.stdout.flush()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
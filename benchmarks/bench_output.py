@@ -0,0 +1,114 @@
+"""
+count the bytes consolemd writes for the benchmark corpus
+
+    python -m benchmarks.bench_output                      # just report
+    python -m benchmarks.bench_output --save base.json     # record a baseline
+    python -m benchmarks.bench_output --compare base.json  # fail if output grew
+
+every byte of escape sequence has to go down the wire (think slow ssh
+links) and be parsed by the terminal, so this reports how much of the
+output is escapes rather than text. Unlike timings the counts are exact
+so any growth against a baseline is reported.
+"""
+
+import re
+import sys
+import json
+import argparse
+
+import consolemd
+
+from .corpus import corpus
+from .bench_render import modes
+
+escape_re = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def render(text, **kw):
+    return consolemd.Renderer().render_to_string(text, **kw)
+
+
+def run(large_size, width):
+    results = {}
+
+    for name, text in corpus(large_size):
+        for mode, options in modes:
+            out = render(text, width=width, **options)
+            escapes = escape_re.findall(out)
+
+            results['{}/{}'.format(name, mode)] = dict(
+                bytes=len(out.encode('utf-8')),
+                escape_bytes=sum(len(escape) for escape in escapes),
+                escapes=len(escapes),
+            )
+
+    return results
+
+
+def report(results, baseline=None):
+    """
+    print a table and return the names of documents whose output grew
+    """
+    header = "{:<16} {:>10} {:>10} {:>8} {:>7}".format(
+        'document', 'KB', 'escape KB', 'escapes', 'escape%',
+    )
+    if baseline:
+        header += " {:>8}".format('vs base')
+
+    print(header)
+    print('-' * len(header))
+
+    grew = []
+
+    for name, result in results.items():
+        line = "{:<16} {:>10.1f} {:>10.1f} {:>8} {:>6.0f}%".format(
+            name, result['bytes'] / 1024.0, result['escape_bytes'] / 1024.0,
+            result['escapes'], 100.0 * result['escape_bytes'] / max(1, result['bytes']),
+        )
+
+        if baseline and name in baseline:
+            ratio = result['bytes'] / float(baseline[name]['bytes'])
+            line += " {:>7.2f}x".format(ratio)
+            if ratio > 1.0:
+                line += " LARGER"
+                grew.append(name)
+
+        print(line)
+
+    return grew
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--large', type=int, default=2048,
+            help="size of the large document in KB, 0 to skip (def: 2048)")
+    parser.add_argument('-w', '--width', type=int, default=None,
+            help="render with this --width")
+    parser.add_argument('--save', metavar='FILE',
+            help="save the results as a baseline")
+    parser.add_argument('--compare', metavar='FILE',
+            help="compare against a saved baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.large * 1024, args.width)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+
+    grew = report(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+
+    if grew:
+        print("\nlarger output: {}".format(', '.join(grew)))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+render the benchmark corpus and report where the time goes
+
+    python -m benchmarks.bench_render                      # just report
+    python -m benchmarks.bench_render --save base.json     # record a baseline
+    python -m benchmarks.bench_render --compare base.json  # fail on regressions
+
+every document is rendered in true color, 256 color and plain mode. The total is
+the best of --repeat clean runs; the parse/walk/style/highlight split
+comes from one extra run with a consolemd.tracing.Stats tracer and is
+reported as fractions of it.
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+
+import consolemd
+from consolemd.tracing import Stats
+
+from .corpus import corpus
+
+modes = [('16m', dict(true_color=True)), ('256', dict(true_color=False)), ('plain', dict(plain=True))]
+
+
+def render(text, **kw):
+    consolemd.Renderer().render(text, output=io.StringIO(), flush='end', **kw)
+
+
+def best_of(repeat, func, *args, **kw):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kw)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def breakdown(text, **kw):
+    """
+    render text once with a tracer to see how long parsing, styling and
+    highlighting took, walk is whatever is left (handlers, prefixes, output)
+    """
+    stats = Stats()
+
+    start = time.perf_counter()
+    render(text, tracer=stats, **kw)
+    total = time.perf_counter() - start
+
+    spent = dict(
+        parse     = stats.seconds('parse'),
+        style     = stats.seconds('escape'),
+        highlight = stats.seconds('highlight'),
+    )
+    spent['walk'] = max(0.0, total - sum(spent.values()))
+
+    return {key: value / total for key, value in spent.items()}
+
+
+def run(repeat, large_size, width):
+    results = {}
+
+    for name, text in corpus(large_size):
+        size = len(text.encode('utf-8'))
+        runs = 1 if size > 512 * 1024 else repeat
+
+        for mode, options in modes:
+            render(text, width=width, **options) # warm up caches and imports
+            secs = best_of(runs, render, text, width=width, **options)
+
+            results['{}/{}'.format(name, mode)] = dict(
+                bytes=size,
+                secs=secs,
+                split=breakdown(text, width=width, **options),
+            )
+
+    return results
+
+
+def report(results, baseline=None, threshold=0.10):
+    """
+    print a table and return the names of regressed documents
+    """
+    header = "{:<16} {:>9} {:>10} {:>9} {:>6} {:>6} {:>6} {:>6}".format(
+        'document', 'KB', 'ms/doc', 'ms/MB', 'parse', 'walk', 'style', 'hilite',
+    )
+    if baseline:
+        header += " {:>8}".format('vs base')
+
+    print(header)
+    print('-' * len(header))
+
+    regressed = []
+
+    for name, result in results.items():
+        mb = result['bytes'] / (1024.0 * 1024.0)
+        split = result['split']
+
+        line = "{:<16} {:>9.1f} {:>10.2f} {:>9.1f} {:>5.0f}% {:>5.0f}% {:>5.0f}% {:>5.0f}%".format(
+            name, result['bytes'] / 1024.0,
+            result['secs'] * 1000, result['secs'] * 1000 / mb,
+            split['parse'] * 100, split['walk'] * 100, split['style'] * 100, split['highlight'] * 100,
+        )
+
+        if baseline and name in baseline:
+            # compare per byte so edits to the curated docs don't count
+            base = baseline[name]
+            ratio = (result['secs'] / result['bytes']) / (base['secs'] / base['bytes'])
+            line += " {:>7.2f}x".format(ratio)
+            if ratio > 1.0 + threshold:
+                line += " SLOWER"
+                regressed.append(name)
+
+        print(line)
+
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--repeat', type=int, default=5,
+            help="best of this many runs per document (def: 5)")
+    parser.add_argument('--large', type=int, default=2048,
+            help="size of the large document in KB, 0 to skip (def: 2048)")
+    parser.add_argument('-w', '--width', type=int, default=None,
+            help="render with this --width")
+    parser.add_argument('--save', metavar='FILE',
+            help="save the results as a baseline")
+    parser.add_argument('--compare', metavar='FILE',
+            help="compare against a saved baseline")
+    parser.add_argument('--threshold', type=float, default=10.0,
+            help="percent slower than the baseline that counts as a regression (def: 10)")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.large * 1024, args.width)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+
+    regressed = report(results, baseline, args.threshold / 100.0)
+
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+
+    if regressed:
+        print("\nregressions: {}".format(', '.join(regressed)))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
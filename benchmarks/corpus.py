@@ -0,0 +1,165 @@
+"""
+a representative set of markdown documents for benchmarking
+
+everything is generated from a fixed seed (or read from this repo) so the
+corpus is identical between runs and machines and needs no network
+"""
+
+import os
+import random
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+words = """
+the quick brown fox jumps over lazy dog render markdown console terminal
+color style paragraph heading list item code block link image footnote
+parser walker escape sequence pygments commonmark lexer formatter buffer
+stream flush width wrap text emphasis strong quote nested document
+""".split()
+
+languages = ['python', 'bash', 'json', 'c', 'javascript', 'yaml', 'text', 'nosuchlang']
+
+code_samples = {
+    'python': "def f(x, y=2):\n    \"\"\"doc\"\"\"\n    return [i * y for i in range(x) if i % 3]\n",
+    'bash': "for f in *.md; do\n    consolemd \"$f\" | less -R\ndone\n",
+    'json': '{"name": "consolemd", "version": [0, 5, 1], "ok": true, "none": null}\n',
+    'c': "int main(int argc, char **argv) {\n    printf(\"%d\\n\", argc);\n    return 0;\n}\n",
+    'javascript': "const f = (x) => x.map(y => y * 2).filter(Boolean);\nconsole.log(f([1, 2, 3]));\n",
+    'yaml': "name: consolemd\nsteps:\n  - run: pytest\n  - run: consolemd README.md\n",
+    'text': "just some plain text\nin a fenced block\n",
+    'nosuchlang': "this language doesn't exist\n",
+}
+
+
+def sentence(rand, n=None):
+    n = n or rand.randint(6, 18)
+    text = ' '.join(rand.choice(words) for _ in range(n))
+    return text[0].upper() + text[1:] + '.'
+
+
+def paragraph(rand, sentences=None):
+    sentences = sentences or rand.randint(2, 6)
+    return '\n'.join(sentence(rand) for _ in range(sentences))
+
+
+def inline(rand):
+    """
+    a sentence sprinkled with inline markup
+    """
+    parts = []
+    for word in sentence(rand).split():
+        choice = rand.random()
+        if choice < 0.05:
+            word = '*{}*'.format(word)
+        elif choice < 0.10:
+            word = '**{}**'.format(word)
+        elif choice < 0.13:
+            word = '`{}`'.format(word)
+        parts.append(word)
+    return ' '.join(parts)
+
+
+def prose(rand, sections=40):
+    out = []
+    for i in range(sections):
+        out.append('{} {}'.format('#' * rand.randint(1, 3), sentence(rand, 4)))
+        for _ in range(rand.randint(2, 5)):
+            out.append(paragraph(rand))
+    return '\n\n'.join(out) + '\n'
+
+
+def lists(rand, count=60):
+    out = []
+    for i in range(count):
+        ordered = i % 2
+        for n in range(rand.randint(3, 8)):
+            marker = '{}.'.format(n + 1) if ordered else '-'
+            out.append('{} {}'.format(marker, inline(rand)))
+            for _ in range(rand.randint(0, 2)):
+                out.append('   - {}'.format(inline(rand)))
+        out.append('')
+        out.append(paragraph(rand, 1))
+        out.append('')
+    return '\n'.join(out) + '\n'
+
+
+def links(rand, paragraphs=80):
+    out = []
+    for i in range(paragraphs):
+        parts = []
+        for word in paragraph(rand).split():
+            if rand.random() < 0.15:
+                url = 'https://example.com/{}/{}'.format(word.lower().strip('.'), rand.randint(0, 999))
+                if rand.random() < 0.2:
+                    word = '![{}]({})'.format(word, url)
+                else:
+                    word = '[{}]({})'.format(word, url)
+            parts.append(word)
+        out.append(' '.join(parts))
+    return '\n\n'.join(out) + '\n'
+
+
+def code(rand, blocks=60):
+    out = []
+    for i in range(blocks):
+        lang = rand.choice(languages)
+        out.append(paragraph(rand, 1))
+        out.append('```{}\n{}```'.format(lang, code_samples[lang] * rand.randint(1, 4)))
+    return '\n\n'.join(out) + '\n'
+
+
+def nested(rand, depth=8, repeat=15):
+    out = []
+    for _ in range(repeat):
+        for level in range(depth):
+            indent = '  ' * level
+            out.append('{}- {}'.format(indent, inline(rand)))
+        out.append('')
+        for level in range(1, depth):
+            out.append('{} {}'.format('>' * level, inline(rand)))
+        out.append('')
+        out.append('> - *{}* **{}**'.format(sentence(rand, 3), sentence(rand, 3)))
+        out.append('>   1. [{}](https://example.com)'.format(sentence(rand, 2)))
+        out.append('')
+    return '\n'.join(out) + '\n'
+
+
+def large(rand, size=2 * 1024 * 1024):
+    """
+    a mix of everything, about size bytes
+    """
+    generators = [prose, lists, links, code, nested]
+    out = []
+    total = 0
+    while total < size:
+        text = rand.choice(generators)(rand)
+        out.append(text)
+        total += len(text)
+    return '\n'.join(out)
+
+
+def curated(name):
+    with open(os.path.join(root, name), encoding='utf-8') as fh:
+        return fh.read()
+
+
+def corpus(large_size=2 * 1024 * 1024):
+    """
+    return [(name, markdown), ...]
+    """
+    rand = random.Random(0x636d64)
+
+    docs = [
+        ('readme', curated('README.md')),
+        ('changelog', curated('CHANGELOG.md')),
+        ('prose', prose(rand)),
+        ('lists', lists(rand)),
+        ('links', links(rand)),
+        ('code', code(rand)),
+        ('nested', nested(rand)),
+    ]
+
+    if large_size:
+        docs.append(('large', large(rand, large_size)))
+
+    return docs
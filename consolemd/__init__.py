@@ -6,4 +6,12 @@ __license__      = 'MIT License'
 __url__          = 'https://github.com/kneufeld/consolemd'
 __copyright__    = 'Copyright 2017 Kurt Neufeld'
 
-from .renderer import Renderer
+
+def __getattr__(name):
+    # importing the renderer pulls in commonmark and pygments, don't pay
+    # for that until somebody actually wants to render something
+    if name == 'Renderer':
+        from .renderer import Renderer
+        return Renderer
+
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
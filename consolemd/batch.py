@@ -0,0 +1,163 @@
+"""
+render many files at once, optionally spread over a pool of processes so
+that python, pygments and commonmark only start up once per worker
+instead of once per file
+"""
+
+import os
+import io
+import glob
+
+import logging
+logger = logging.getLogger('consolemd')
+
+
+def expand_inputs(patterns):
+    """
+    return the files named by patterns, in order, expanding any globs
+    (which the shell may not have done if they were quoted)
+
+    raises OSError if a plain filename doesn't exist or a glob matches nothing
+    """
+    paths = []
+
+    for pattern in patterns:
+        # a file that exists is never a glob, eg. notes[1].md
+        if pattern == '-' or os.path.exists(pattern):
+            paths.append(pattern)
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                raise OSError("no files match: {}".format(pattern))
+            paths.extend(matches)
+        else:
+            raise OSError("no such file: {}".format(pattern))
+
+    return paths
+
+
+def output_paths(output_dir, paths):
+    """
+    return [where the rendered version of each path goes in output_dir],
+    paths keep their directories below the current one or, if any of them
+    is elsewhere, below the directory they all have in common
+
+    raises ValueError if two paths would be written to the same place
+    (eg. README.md and README.markdown) or one of them is stdin
+    """
+    if '-' in paths:
+        raise ValueError("stdin (-) has no name to write it to in --output-dir")
+
+    absolute = [os.path.abspath(path) for path in paths]
+    root = os.getcwd()
+
+    if any(os.path.relpath(path, root).startswith(os.pardir) for path in absolute):
+        root = os.path.commonpath([os.path.dirname(path) for path in absolute])
+
+    dests = []
+    seen = {}
+
+    for path, full in zip(paths, absolute):
+        rel = os.path.relpath(full, root)
+        dest = os.path.join(output_dir, os.path.splitext(rel)[0] + '.txt')
+
+        if seen.setdefault(dest, full) != full:
+            raise ValueError("{} and {} would both be written to {}".format(
+                os.path.relpath(seen[dest]), path, dest
+            ))
+
+        dests.append(dest)
+
+    return dests
+
+
+def read_file(path):
+    import click
+
+    with click.open_file(path, 'r') as fh:
+        return fh.read()
+
+
+def render_file(path, dest, text, options, cache=False):
+    """
+    render a single file and return (path, output, error), if dest is
+    given the output is written there and None is returned instead. text
+    is the file's contents if they were already read, None otherwise.
+    """
+    from .renderer import Renderer
+    from .cache import RenderCache, render_cached
+
+    if text is None:
+        try:
+            text = read_file(path)
+        except (OSError, UnicodeDecodeError) as e:
+            return path, None, str(e)
+
+    if cache:
+        out = io.StringIO()
+        render_cached(RenderCache(), Renderer, text, **dict(options, output=out))
+        output = out.getvalue()
+    else:
+        renderer = Renderer(style_name=options['style'])
+        output = renderer.render_to_string(text, **options)
+
+    if dest is None:
+        return path, output, None
+
+    try:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, 'w', encoding='utf-8') as fh:
+            fh.write(output)
+    except OSError as e:
+        return path, None, str(e)
+
+    return path, None, None
+
+
+def render_files(paths, options, output=None, output_dir=None, jobs=1, cache=False):
+    """
+    render paths with jobs processes and write the results to output in
+    input order (or to output_dir), return the number of failed files
+
+    raises ValueError if output_dir is given and two paths would be
+    written to the same file in it
+    """
+    from functools import partial
+
+    if output_dir is None:
+        dests = [None] * len(paths)
+    else:
+        dests = output_paths(output_dir, paths)
+
+    # a worker's stdin isn't ours so stdin is read here and passed along
+    texts = [read_file(path) if path == '-' else None for path in paths]
+
+    options = dict(options, flush='end')
+    work = partial(render_file, options=options, cache=cache)
+
+    if jobs > 1 and len(paths) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=min(jobs, len(paths)))
+        # big chunks keep the ipc overhead down when there are thousands of files
+        chunksize = max(1, min(32, len(paths) // (jobs * 4)))
+        results = pool.map(work, paths, dests, texts, chunksize=chunksize)
+    else:
+        pool = None
+        results = map(work, paths, dests, texts)
+
+    failed = 0
+
+    try:
+        for path, rendered, error in results:
+            if error is not None:
+                logger.error("%s: %s", path, error)
+                failed += 1
+            elif rendered is not None:
+                output.write(rendered)
+                output.flush()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return failed
@@ -0,0 +1,170 @@
+"""
+splits markdown source into chunks of top level blocks that can be parsed
+and rendered independently of each other
+
+a new chunk only starts after a blank line, outside of fenced code and
+raw html, on a line that starts in the first column and can't continue
+a list. CommonMark can't join anything across such a boundary with one
+exception: link reference definitions only apply to the chunk they're in.
+"""
+
+import re
+
+fence_re       = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+fence_close_re = re.compile(r"^ {0,3}(`{3,}|~{3,})[ \t]*$")
+list_re        = re.compile(r"^([-+*]|\d{1,9}[.)])(\s|$)")
+
+# html blocks that may contain blank lines, see CommonMark spec 4.6
+html_start_re = re.compile(r"^ {0,3}(<!--|<\?|<![A-Z]|<!\[CDATA\[|<(script|pre|style|textarea)(\s|>|$))", re.IGNORECASE)
+
+# html blocks that end at a blank line (kind 6), they can't hide a block
+# boundary but the lines in them aren't markdown either
+html_block_tags = (
+    'address article aside base basefont blockquote body caption center col '
+    'colgroup dd details dialog dir div dl dt fieldset figcaption figure footer '
+    'form frame frameset h1 h2 h3 h4 h5 h6 head header hr html iframe legend '
+    'li link main menu menuitem nav noframes ol optgroup option p param search '
+    'section summary table tbody td tfoot th thead title tr track ul'
+)
+html_block_re = re.compile(
+    r"^ {{0,3}}</?({})(\s|/?>|$)".format('|'.join(html_block_tags.split())),
+    re.IGNORECASE,
+)
+
+
+def _html_end(start):
+    """
+    return what closes the html block started by the regex match start
+    """
+    opener = start.group(1).lower()
+
+    if start.group(2):
+        return '</{}>'.format(start.group(2).lower())
+    if opener == '<!--':
+        return '-->'
+    if opener == '<?':
+        return '?>'
+    if opener == '<![cdata[':
+        return ']]>'
+
+    return '>'
+
+
+def closes_fence(line, fence):
+    """
+    does line close the fenced code block opened with fence, it has to
+    be at most 3 spaces in and at least as long, with nothing after it
+    """
+    match = fence_close_re.match(line)
+    return bool(match) and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence)
+
+
+class RawBlocks(object):
+    """
+    follows fenced code and html blocks through a document line by line,
+    what's in them isn't markdown so there are no headings or block
+    boundaries in there
+    """
+
+    def __init__(self):
+        self.fence    = None  # the fence string we're inside of
+        self.html_end = None  # what ends the html block we're inside of, '' for a blank line
+
+    def inside(self, line):
+        """
+        return True if line belongs to a block opened on an earlier line,
+        the blank line ending an html block doesn't
+        """
+        if self.fence is not None:
+            if closes_fence(line, self.fence):
+                self.fence = None
+            return True
+
+        if self.html_end == '':
+            if line.strip():
+                return True
+            self.html_end = None
+
+        elif self.html_end is not None:
+            if self.html_end in line.lower():
+                self.html_end = None
+            return True
+
+        return False
+
+    def opens(self, line):
+        """
+        return True if line starts a fenced code or html block
+        """
+        match = fence_re.match(line)
+        if match:
+            self.fence = match.group(1)
+            return True
+
+        match = html_start_re.match(line)
+        if match:
+            end = _html_end(match)
+            if end not in line[match.end():].lower():
+                self.html_end = end
+            return True
+
+        if html_block_re.match(line):
+            self.html_end = ''
+            return True
+
+        return False
+
+
+def is_boundary(line):
+    """
+    can a new top level block start on line, assuming it follows a blank line
+    """
+    return bool(line) and not line[0].isspace() and not list_re.match(line)
+
+
+def split_blocks(lines):
+    """
+    group an iterable of lines (eg. a file) into chunks of markdown, a chunk
+    is yielded as soon as it's known that nothing can be added to it
+    """
+    chunk = []
+    raw = RawBlocks()
+    blank = False    # was the previous line blank
+    simple = True    # could every line since the last blank line start a block
+
+    for line in lines:
+
+        if not chunk and not line.strip():
+            # leading blank lines, there's nothing to finish yet
+            continue
+
+        if blank and is_boundary(line):
+            yield ''.join(chunk)
+            chunk = []
+
+        chunk.append(line)
+        stripped = line.strip()
+
+        if raw.inside(line):
+            continue
+
+        if not stripped:
+            if simple and not blank:
+                # paragraphs, headings, quotes etc. all end at a blank
+                # line so there's no need to wait for the next line
+                yield ''.join(chunk)
+                chunk = []
+            else:
+                # the next line decides if a list (or indented code) goes on
+                blank = True
+
+            simple = True
+            continue
+
+        blank = False
+        simple = simple and is_boundary(line)
+
+        raw.opens(line)
+
+    if chunk:
+        yield ''.join(chunk)
@@ -0,0 +1,251 @@
+"""
+persistent cache of rendered output
+
+entries are keyed by a digest of the markdown and every option that
+changes the output, so a hit can be written out without parsing or
+highlighting anything. Entries are written atomically (temp file and
+rename) so concurrent consolemd processes can share the cache, and the
+least recently used ones are removed once the cache grows past max_size.
+
+the total size of the entries is kept in a small file next to them so a
+write only has to look at every entry once the cache is actually full.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import tempfile
+
+try:
+    import fcntl
+except ImportError: # windows
+    fcntl = None
+
+import logging
+logger = logging.getLogger('consolemd')
+
+
+def default_path():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'consolemd', 'render')
+
+
+class RenderCache(object):
+
+    suffix = '.out'
+
+    def __init__(self, path=None, max_size=32 * 1024 * 1024):
+        self.path = path or default_path()
+        self.max_size = max_size
+
+    def key(self, text, **options):
+        """
+        return the cache key for rendering text with options, options must
+        contain everything that changes the output (style, width, etc.)
+        """
+        from . import __version__
+
+        options = dict(options, version=__version__)
+
+        digest = hashlib.sha256()
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8', 'surrogateescape'))
+
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.path, key[:2], key + self.suffix)
+
+    def _update_size(self, update):
+        """
+        replace the running total of entry sizes with update(total) and
+        return the new total, total is None if there isn't one yet. The
+        file is locked so concurrent writers don't lose each other's sizes.
+        """
+        fd = os.open(os.path.join(self.path, 'size'), os.O_RDWR | os.O_CREAT, 0o644)
+
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+
+            try:
+                total = int(os.read(fd, 64))
+            except ValueError:
+                total = None
+
+            total = update(total)
+
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            if total is not None:
+                os.write(fd, str(total).encode('ascii'))
+
+            return total
+        finally:
+            os.close(fd) # also unlocks
+
+    def get(self, key):
+        """
+        return the cached bytes for key or None
+        """
+        entry = self._entry(key)
+
+        try:
+            with open(entry, 'rb') as fh:
+                data = fh.read()
+        except OSError:
+            return None
+
+        try:
+            # mtime is our "last used" time for eviction
+            os.utime(entry)
+        except OSError:
+            pass
+
+        return data
+
+    def put(self, key, data):
+        """
+        atomically store data (bytes) for key, failures are only logged
+        since the cache is just an optimization
+        """
+        entry = self._entry(key)
+
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+            try:
+                replaced = os.stat(entry).st_size
+            except OSError:
+                replaced = 0
+
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(entry), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as fh:
+                    fh.write(data)
+                os.replace(tmp, entry)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+            grown = len(data) - replaced
+            total = self._update_size(lambda total: None if total is None else total + grown)
+
+            if total is None or total > self.max_size:
+                self.evict()
+        except OSError as e:
+            logger.warning("unable to write render cache: %s", e)
+
+    def _entries(self):
+        """
+        return (mtime, size, path) of every cache entry
+        """
+        entries = []
+
+        try:
+            shards = list(os.scandir(self.path))
+        except OSError:
+            return entries
+
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError: # evicted by somebody else
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        return entries
+
+    def evict(self):
+        """
+        remove the least recently used entries until we're under max_size
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+
+        if total > self.max_size:
+            for _, size, path in sorted(entries):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+                total -= size
+                if total <= self.max_size:
+                    break
+
+        # the scan is the real total, whatever the running one drifted to
+        self._update_size(lambda _: total)
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+        try:
+            self._update_size(lambda _: 0)
+        except OSError:
+            pass
+
+
+def write_bytes(stream, data):
+    """
+    write utf-8 encoded data to a text stream, directly to its binary
+    buffer if the encodings match
+    """
+    buffer = getattr(stream, 'buffer', None)
+    encoding = (getattr(stream, 'encoding', None) or '').lower().replace('-', '')
+
+    if buffer is not None and encoding == 'utf8' and os.linesep == '\n':
+        stream.flush()
+        buffer.write(data)
+        buffer.flush()
+    else:
+        stream.write(data.decode('utf-8', 'surrogateescape'))
+        stream.flush()
+
+
+def render_cached(store, make_renderer, text, **kw):
+    """
+    render text to kw['output'] with make_renderer(style_name=kw['style']),
+    or write the cached output from store if this exact text was already
+    rendered with the same options. A hit never creates a renderer so
+    commonmark and pygments don't even get imported.
+    """
+    import consolemd.escapeseq
+
+    style = kw.get('style') or 'native'
+
+    true_color = kw.get('true_color')
+    if true_color is None:
+        true_color = consolemd.escapeseq._true_color
+
+    key = store.key(
+        text,
+        style      = style,
+        width      = kw.get('width'),
+        soft_wrap  = bool(kw.get('soft_wrap', True)),
+        true_color = bool(true_color),
+        plain      = bool(kw.get('plain')),
+    )
+
+    data = store.get(key)
+
+    if data is None:
+        renderer = make_renderer(style_name=style)
+        data = renderer.render_to_bytes(text, **kw)
+        store.put(key, data)
+    else:
+        logger.debug("render cache hit: %s", key)
+
+    write_bytes(kw.get('output') or sys.stdout, data)
@@ -4,6 +4,7 @@ highlighting the markdown. The difference being that the control
 characters are stripped.
 """
 
+import io
 import os
 import sys
 import click
@@ -78,20 +79,26 @@ def enable_color(ctx, param, value):
 
 
 def set_true_color(ctx, param, value):
+    # the global is still the default for anything that isn't handed
+    # true_color explicitly (eg. log messages)
     import consolemd.escapeseq
     consolemd.escapeseq._true_color = value
+    return value
 
 
-def verify_style_name(ctx, param, value):
-    import pygments.styles
-    import pygments.util
+def verify_style_name(ctx, value):
+    """
+    fail unless value is a pygments style, this isn't a click callback
+    since it means importing pygments which isn't needed for --help,
+    --version or a cache hit
+    """
+    from .styler import Style
 
-    try:
-        pygments.styles.get_style_by_name(value)
-        return value
-    except pygments.util.ClassNotFound:
+    if Style.find_style(value) is None:
         ctx.fail("invalid style name: {}".format(value))
 
+    return value
+
 def show_version(ctx, param, value):
     if not value or ctx.resilient_parsing:
         return
@@ -118,6 +125,9 @@ CTX_SETTINGS = dict(help_option_names=['-h', '--help'])
         default=os.environ.get('CONSOLEMD_TRUECOL', True),
         callback=set_true_color, is_eager=True,
         help="enable/disable true color (16m colors)")
+@click.option('--plain/--no-plain',
+        default=None,
+        help="just the text, no colors or highlighting (def: on if NO_COLOR is set)")
 @click.option('--soft-wrap/--no-soft-wrap',
         default=os.environ.get('CONSOLEMD_WRAP', True),
         help="output lines wrap along with source lines")
@@ -127,24 +137,147 @@ CTX_SETTINGS = dict(help_option_names=['-h', '--help'])
 @click.option('-o', '--output',
         type=click.File('w'), default=sys.stdout,
         help="output to a file, stdout by default")
+@click.option('--flush',
+        type=click.Choice(['block', 'threshold', 'end']), default=None,
+        help="when to flush output (def: block on a tty, threshold otherwise)")
+@click.option('--stream/--no-stream',
+        default=False,
+        help="render each block as soon as it's read instead of reading everything first")
+@click.option('--pager/--no-pager',
+        default=os.environ.get('CONSOLEMD_PAGER', False),
+        help="page through the document, rendering only what's shown (needs a terminal)")
+@click.option('--watch',
+        is_flag=True, default=False,
+        help="keep showing INPUT, rendering it again whenever it's saved")
+@click.option('--section',
+        multiple=True, metavar='TITLE',
+        help="only render the section under this heading, can be repeated")
+@click.option('--outline',
+        is_flag=True, default=False,
+        help="only print the document's headings")
+@click.option('-j', '--jobs',
+        type=click.IntRange(min=1), default=1,
+        help="render multiple files, or highlight a big file's code blocks, with this many processes")
+@click.option('--output-dir',
+        type=click.Path(file_okay=False), default=None,
+        help="write each rendered file to DIR/<input>.txt instead of output")
+@click.option('--cache/--no-cache',
+        default=os.environ.get('CONSOLEMD_CACHE', False),
+        help="reuse previously rendered output of unchanged input")
+@click.option('--trace',
+        is_flag=True, default=False,
+        help="print where the render time went to stderr")
 @click.option('-s', '--style',
         type=str, default=os.environ.get('CONSOLEMD_STYLE', 'native'),
-        callback=verify_style_name, is_eager=True,
         help="what pygments style to use for coloring (def: native)")
-@click.argument('input', type=click.File('r'), default=sys.stdin)
+@click.argument('inputs', metavar='[INPUT]...', nargs=-1)
 @click.pass_context
-def cli(ctx, input, **kw):
+def cli(ctx, inputs, **kw):
     """
-    render some markdown
+    render some markdown, from stdin if no INPUT files or globs are given
     """
 
     rename_proc( 'consolemd' )
 
-    md = input.read()
+    from .batch import expand_inputs, render_files
+
+    try:
+        paths = expand_inputs(inputs or ['-'])
+    except OSError as e:
+        ctx.fail(str(e))
+
+    def make_renderer(style_name):
+        import consolemd
+        # --plain never uses the style so don't import pygments to check it
+        if not kw['plain']:
+            verify_style_name(ctx, style_name)
+        return consolemd.Renderer(style_name=style_name)
+
+    if kw['plain'] is None:
+        # see https://no-color.org
+        kw['plain'] = bool(os.environ.get('NO_COLOR'))
+
+    if kw['watch'] and (kw['outline'] or kw['section']):
+        ctx.fail("--watch can't be combined with --outline or --section")
+
+    if len(paths) > 1 or kw['output_dir']:
+        single = [
+            name for name in ('outline', 'section', 'pager', 'watch', 'stream', 'trace', 'flush')
+            if kw[name]
+        ]
+        if single:
+            ctx.fail("--{} only works with a single INPUT and no --output-dir".format(single[0]))
+
+        if not kw['plain']:
+            verify_style_name(ctx, kw['style'])
+
+        options = dict(
+            style=kw['style'], width=kw['width'], soft_wrap=kw['soft_wrap'],
+            true_color=kw['true_color'], plain=kw['plain'],
+        )
+        try:
+            failed = render_files(
+                paths, options,
+                output=kw['output'], output_dir=kw['output_dir'], jobs=kw['jobs'],
+                cache=kw['cache'],
+            )
+        except ValueError as e:
+            ctx.fail(str(e))
+        ctx.exit(1 if failed else 0)
+
+    if kw['watch'] and paths[0] == '-':
+        ctx.fail("--watch needs an INPUT file")
+
+    if kw['flush'] is None:
+        interactive = kw['stream'] or kw['output'].isatty()
+        kw['flush'] = 'block' if interactive else 'threshold'
+
+    kw['highlight_jobs'] = kw['jobs']
+
+    if kw['trace']:
+        from .tracing import Stats
+        kw['tracer'] = Stats()
+
+    if kw['watch']:
+        from .watch import watch
+        watch(make_renderer(kw['style']), paths[0], **kw)
+        return
+
+    with click.open_file(paths[0], 'r') as input:
+        if kw['outline'] or kw['section']:
+            from .sections import load_index, index_path
+            from .cache import RenderCache
+
+            text = input.read()
+            index = load_index(text, RenderCache(index_path()) if kw['cache'] else None)
+
+            if kw['outline']:
+                kw['output'].write(index.outline())
+                return
+
+            try:
+                text = '\n'.join(index.section(text, title) for title in kw['section'])
+            except KeyError as e:
+                ctx.fail("no such section: {}".format(e.args[0]))
+
+            # the rest only sees the sections
+            input = io.StringIO(text)
+
+        if kw['pager'] and kw['output'].isatty():
+            from .pager import page
+            text = input.read()
+            if not page(make_renderer(kw['style']), text, **kw):
+                make_renderer(kw['style']).render( text, **kw )
+        elif kw['stream']:
+            make_renderer(kw['style']).render_stream( input, **kw )
+        elif kw['cache']:
+            from .cache import RenderCache, render_cached
+            render_cached( RenderCache(), make_renderer, input.read(), **kw )
+        else:
+            make_renderer(kw['style']).render( input.read(), **kw )
 
-    import consolemd
-    renderer = consolemd.Renderer(style_name=kw['style'])
-    renderer.render( md, **kw )
+    if kw['trace']:
+        click.echo(kw['tracer'].report(), err=True)
 
 if __name__ == "__main__":
     cli()
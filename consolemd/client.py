@@ -0,0 +1,208 @@
+"""
+a thin client for consolemd.server
+
+this is meant to start as fast as python can, so it only uses the
+standard library and doesn't import click, commonmark or pygments. If no
+server is running then the input is rendered in-process by consolemd.cli
+with the same arguments.
+"""
+
+import os
+import sys
+import json
+import stat
+import socket
+import argparse
+
+false_values = ('0', 'false', 'f', 'no', 'n', 'off', '')
+
+
+def socket_path():
+    """
+    where the server listens, $CONSOLEMD_SOCKET if it's set
+    """
+    path = os.environ.get('CONSOLEMD_SOCKET')
+    if path:
+        return path
+
+    return os.path.join(runtime_dir(), 'consolemd.sock')
+
+
+def runtime_dir():
+    """
+    $XDG_RUNTIME_DIR or failing that our own directory in /tmp, see private_dir
+    """
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return runtime
+
+    return os.path.join('/tmp', 'consolemd-{}'.format(os.getuid()))
+
+
+def private_dir(path):
+    """
+    create directory path if needed, fail if somebody else owns it or can
+    get into it since they could swap our socket for their own
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+
+    st = os.lstat(path)
+
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise OSError("{} isn't a directory only we can use".format(path))
+
+    return path
+
+
+def env_bool(key, default=True):
+    value = os.environ.get(key)
+    if value is None:
+        return default
+    return value.strip().lower() not in false_values
+
+
+def env_width():
+    for key in ['CONSOLEMD_WIDTH', 'MANWIDTH']:
+        value = os.environ.get(key)
+        if value is not None:
+            return int(value)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='consolemd-client',
+        description="render markdown with a running consolemd-server",
+    )
+    parser.add_argument('--socket', default=None)
+    parser.add_argument('-s', '--style', default=os.environ.get('CONSOLEMD_STYLE', 'native'))
+    parser.add_argument('-w', '--width', type=int, default=None)
+    parser.add_argument('--true-color', dest='true_color', action='store_true',
+            default=env_bool('CONSOLEMD_TRUECOL'))
+    parser.add_argument('--no-true-color', dest='true_color', action='store_false')
+    parser.add_argument('--plain', dest='plain', action='store_true',
+            default=bool(os.environ.get('NO_COLOR')))
+    parser.add_argument('--no-plain', dest='plain', action='store_false')
+    parser.add_argument('--soft-wrap', dest='soft_wrap', action='store_true',
+            default=env_bool('CONSOLEMD_WRAP'))
+    parser.add_argument('--no-soft-wrap', dest='soft_wrap', action='store_false')
+    parser.add_argument('input', nargs='?', default='-')
+
+    return parser.parse_args(argv)
+
+
+def connect(path):
+    """
+    return a socket connected to the server or None, a socket somebody
+    else owns is never used: they'd get to read our input and write
+    whatever they like to our terminal
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    if st.st_uid != os.getuid():
+        sys.stderr.write("consolemd-client: not using {}, it isn't ours\n".format(path))
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+
+    return sock
+
+
+def fallback(argv):
+    """
+    render in this process, the client's arguments are a subset of
+    consolemd.cli's so they're passed through as is
+    """
+    args = []
+    skip = False
+
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == '--socket':
+            skip = True
+        elif not arg.startswith('--socket='):
+            args.append(arg)
+
+    from .cli import cli
+    cli(args, prog_name='consolemd-client')
+
+
+def render(sock, args):
+    """
+    send our input to the server and copy its output to stdout, returns
+    an exit status
+    """
+    width = args.width or env_width()
+    if width is not None:
+        width = max(20, width)
+
+    options = dict(
+        style      = args.style,
+        width      = width,
+        soft_wrap  = args.soft_wrap,
+        true_color = args.true_color,
+        plain      = args.plain,
+    )
+
+    if args.input == '-':
+        data = sys.stdin.buffer.read()
+    else:
+        with open(args.input, 'rb') as fh:
+            data = fh.read()
+
+    with sock:
+        sock.sendall(json.dumps(options).encode('utf-8') + b'\n')
+        sock.sendall(data)
+        sock.shutdown(socket.SHUT_WR)
+
+        reply = sock.makefile('rb')
+        status = reply.readline().decode('utf-8').strip()
+
+        if status != 'ok':
+            sys.stderr.write("consolemd-client: {}\n".format(status))
+            return 1
+
+        out = sys.stdout.buffer
+
+        while True:
+            chunk = reply.read1(64 * 1024)
+            if not chunk:
+                break
+            out.write(chunk)
+            out.flush()
+
+    return 0
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args = parse_args(argv)
+
+    sock = connect(args.socket or socket_path())
+
+    if sock is None:
+        return fallback(argv)
+
+    try:
+        sys.exit(render(sock, args))
+    except OSError as e:
+        sys.stderr.write("consolemd-client: {}\n".format(e))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -110,13 +110,94 @@ def reshade( color, per):
     return from_rgb(r,g,b)
 
 
+class _LazyTable(object):
+    """
+    builds the xterm color table the first time it's used, true color
+    rendering never needs it
+    """
+
+    def __get__(self, instance, owner):
+        table = _build_color_table()
+        owner.xterm_colors = table # replaces ourselves
+        return table
+
+
+def _scan_closest(r, g, b, xterm_colors=None):
+    """
+    linear search of the xterm color table for the closest color to r,g,b
+    this is slow, use closest_color() which remembers previous answers
+    """
+    if xterm_colors is None:
+        xterm_colors = ColorMap.xterm_colors
+
+    distance = 257*257*3  # "infinity" (>distance from #000000 to #ffffff)
+    match = 0
+
+    for i in range(0, 254):
+        values = xterm_colors[i]
+
+        rd = r - values[0]
+        gd = g - values[1]
+        bd = b - values[2]
+        d = rd*rd + gd*gd + bd*bd
+
+        if d < distance:
+            match = i
+            distance = d
+
+    return match
+
+
+# packed 0xrrggbb -> xterm index and #colorstring -> xterm index
+# a document only ever uses a handful of colors so these stay tiny
+_closest_cache = {}
+_index_cache = {}
+
+def closest_color(r, g, b):
+    """
+    return the index of the xterm color closest to r,g,b, each distinct
+    color is only ever searched for once
+    """
+    key = (r << 16) | (g << 8) | b
+
+    try:
+        return _closest_cache[key]
+    except KeyError:
+        match = _closest_cache[key] = _scan_closest(r, g, b)
+        return match
+
+
+def color_index(color):
+    """
+    return the closest xterm color index based on a #colorstring
+    """
+    try:
+        return _index_cache[color]
+    except KeyError:
+        pass
+
+    value = ansicolors.get(color, color)[1:]
+
+    try:
+        rgb = int(str(value), 16)
+    except ValueError:
+        rgb = 0
+
+    r = (rgb >> 16) & 0xff
+    g = (rgb >> 8) & 0xff
+    b = rgb & 0xff
+
+    match = _index_cache[color] = closest_color(r, g, b)
+    return match
+
+
 class ColorMap(object):
     """
     return the closest xterm color index based on a #colorstring
     """
 
-    # only called once for all ColorMap instances
-    xterm_colors = _build_color_table()
+    # only built once for all ColorMap instances, on first use
+    xterm_colors = _LazyTable()
 
     def __init__(self, color):
         """
@@ -132,36 +213,7 @@ class ColorMap(object):
         return self._color_index(self._color)
 
     def _closest_color(self, r, g, b):
-        distance = 257*257*3  # "infinity" (>distance from #000000 to #ffffff)
-        match = 0
-
-        for i in range(0, 254):
-            values = self.xterm_colors[i]
-
-            rd = r - values[0]
-            gd = g - values[1]
-            bd = b - values[2]
-            d = rd*rd + gd*gd + bd*bd
-
-            if d < distance:
-                match = i
-                distance = d
-
-        return match
+        return closest_color(r, g, b)
 
     def _color_index(self, color):
-        if color in ansicolors:
-            color = ansicolors[color]
-
-        color = color[1:]
-
-        try:
-            rgb = int(str(color), 16)
-        except ValueError:
-            rgb = 0
-
-        r = (rgb >> 16) & 0xff
-        g = (rgb >> 8) & 0xff
-        b = rgb & 0xff
-
-        return self._closest_color(r, g, b)
+        return color_index(color)
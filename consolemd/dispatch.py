@@ -0,0 +1,69 @@
+"""
+per node type dispatch for the renderer and the styler
+
+both have a method per commonmark node type, Dispatcher collects those
+into a {node type: function} table once per class and binds it once per
+instance so handling a node is a single dict lookup. New node types (eg.
+from a commonmark extension) can be registered without subclassing:
+
+    def callout(renderer, ctx, obj, entering):
+        return '!! ' if entering else ''
+
+    Renderer.register('callout', callout)
+"""
+
+import types
+
+node_types = (
+    'document', 'block_quote', 'list', 'item', 'paragraph', 'heading',
+    'emph', 'strong', 'link', 'image', 'custom_inline', 'custom_block',
+    'text', 'softbreak', 'linebreak', 'code', 'html_inline', 'html_block',
+    'code_block', 'thematic_break',
+)
+
+
+class Dispatcher(object):
+
+    @classmethod
+    def handler_table(cls):
+        """
+        return this class's {node type: function}, built from our base
+        classes' tables and our methods named after a node type
+        """
+        # look in our own __dict__, every subclass gets its own table
+        table = cls.__dict__.get('_handler_table')
+
+        if table is None:
+            table = {}
+
+            for base in reversed(cls.__mro__[1:]):
+                if issubclass(base, Dispatcher):
+                    table.update(base.handler_table())
+
+            table.update({
+                node_type: cls.__dict__[node_type]
+                for node_type in node_types
+                if callable(cls.__dict__.get(node_type))
+            })
+
+            cls._handler_table = table
+
+        return table
+
+    @classmethod
+    def register(cls, node_type, handler):
+        """
+        handle node_type with handler, which is called just like the
+        methods named after node types (self first), this affects
+        renders started afterwards and subclasses that haven't been used yet
+        """
+        cls.handler_table()[node_type] = handler
+
+    def bind_handlers(self):
+        """
+        return {node type: bound method}
+        """
+        return {
+            node_type: types.MethodType(handler, self)
+            for node_type, handler in self.handler_table().items()
+        }
@@ -1,105 +1,200 @@
-from consolemd.colormap import ColorMap, to_rgb, ansicolors
+from consolemd.colormap import color_index, to_rgb, ansicolors
 
 _true_color = True
 
 class EscapeSequence(object):
-    def __init__(self,
+    """
+    an immutable set of terminal attributes
+
+    the color and reset strings are built once when a sequence is created
+    and then read straight from color_str/reset_str, equal sequences are
+    interned so they all share one instance
+    """
+
+    _fields = ('fg', 'bg', 'bold', 'underline', 'italic', 'true_color')
+
+    __slots__ = _fields + ('fg_code', 'bg_code', 'color_str', 'reset_str')
+
+    # (fg, bg, bold, underline, italic, true_color) -> EscapeSequence
+    _pool = {}
+
+    def __new__(cls,
             fg=None, bg=None,
             bold=False, underline=False, italic=False, true_color=None,
-            stream=None,
             ):
 
-        self.fg        = fg
-        self.bg        = bg
-        self.bold      = bold
-        self.underline = underline
-        self.italic    = italic
-        self.stream    = None
-
         if true_color is None:
             true_color = _true_color
 
-        if true_color:
-            self.color_string = self.true_color_string
-        else:
-            self.color_string = self.low_color_string
+        # convert incoming colors to rgb strings
+        fg = ansicolors.get(fg, fg)
+        bg = ansicolors.get(bg, bg)
+
+        key = (fg, bg, bool(bold), bool(underline), bool(italic), bool(true_color))
+
+        try:
+            return cls._pool[key]
+        except KeyError:
+            pass
+
+        self = object.__new__(cls)
+
+        for name, value in zip(cls._fields, key):
+            object.__setattr__(self, name, value)
+
+        object.__setattr__(self, 'fg_code', self.color_code(fg, '38'))
+        object.__setattr__(self, 'bg_code', self.color_code(bg, '48'))
+        object.__setattr__(self, 'color_str', self.escape(self._set_attrs()))
+        object.__setattr__(self, 'reset_str', self._reset_attrs())
+
+        return cls._pool.setdefault(key, self)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EscapeSequence is immutable, use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("EscapeSequence is immutable")
+
+    def __reduce__(self):
+        return (EscapeSequence, self.key())
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __str__(self):
-        return self.color_string()
+        return self.color_str
 
     def __repr__(self):
         return "<ESeq: {} {} {} {} {}>".format(
                 self.fg or '_', self.bg or '_', self.bold, self.underline, self.italic
                 )
 
-    def __enter__(self):
-        self.stream.write( self.color_string() )
+    def key(self):
+        return tuple(getattr(self, name) for name in EscapeSequence._fields)
 
-    def __exit__(self, exc_type, exc_value, traceback):
-        self.stream.write( self.reset_string() )
+    def replace(self, **kw):
+        """
+        return the (interned) sequence with the given attributes changed
+        """
+        values = dict(zip(EscapeSequence._fields, self.key()))
+        values.update(kw)
+        return EscapeSequence(**values)
 
-    @property
-    def fg(self):
-        return self._fg
+    def empty(self):
+        return not (self.fg or self.bg or self.bold or self.underline or self.italic)
 
-    @fg.setter
-    def fg(self, color):
-        # convert incoming color to rgb string
-        self._fg = ansicolors.get(color, color)
+    def overlay(self, other):
+        """
+        return the terminal state after writing other.color_str while in
+        our state, ie. other's attributes on top of ours
+        """
+        try:
+            return _overlays[self, other]
+        except KeyError:
+            pass
+
+        if other.empty():
+            eseq = self
+        elif self.empty():
+            eseq = other
+        else:
+            eseq = EscapeSequence(
+                fg         = other.fg or self.fg,
+                bg         = other.bg or self.bg,
+                bold       = self.bold or other.bold,
+                underline  = self.underline or other.underline,
+                italic     = self.italic or other.italic,
+                true_color = other.true_color,
+            )
+
+        _overlays[self, other] = eseq
+        return eseq
+
+    def transition(self, other):
+        """
+        return the shortest escape sequence that changes the terminal from
+        our state to other's state, only what differs is sent
+        """
+        try:
+            return _transitions[self, other]
+        except KeyError:
+            pass
+
+        attrs = []
 
-    @property
-    def bg(self):
-        return self._bg
+        if self.bold and not other.bold:
+            attrs.append("22")
+        if self.underline and not other.underline:
+            attrs.append("24")
+        if self.italic and not other.italic:
+            attrs.append("23")
 
-    @bg.setter
-    def bg(self, color):
-        # convert incoming color to rgb string
-        self._bg = ansicolors.get(color, color)
+        if self.fg_code != other.fg_code:
+            attrs.append(other.fg_code or "39")
+        if self.bg_code != other.bg_code:
+            attrs.append(other.bg_code or "49")
 
-    def escape(self, attrs):
+        if other.bold and not self.bold:
+            attrs.append("01")
+        if other.underline and not self.underline:
+            attrs.append("04")
+        if other.italic and not self.italic:
+            attrs.append("03")
+
+        # turning a lot off can take more bytes than starting over
+        reset = ["0"] + other._set_attrs()
+        if len(";".join(reset)) < len(";".join(attrs)):
+            attrs = reset
+
+        seq = _transitions[self, other] = self.escape(attrs)
+        return seq
+
+    @staticmethod
+    def escape(attrs):
         if len(attrs):
             return "\x1b[" + ";".join(attrs) + "m"
         return ''
 
-    def low_color_string(self):
-        attrs = []
+    def color_string(self):
+        return self.color_str
 
-        if self.fg is not None:
-            color = ColorMap( self.fg ).color
-            attrs.extend(("38", "5", "%i" % color))
+    def reset_string(self):
+        return self.reset_str
 
-        if self.bg is not None:
-            color = ColorMap( self.bg ).color
-            attrs.extend(("48", "5", "%i" % color))
+    def color_code(self, color, ground):
+        """
+        return the sgr parameters that set color as the fore (38) or
+        back (48) ground, or None if there's no color
+        """
+        if not color:
+            return None
+
+        if self.true_color:
+            r,g,b = map(str, to_rgb(color))
+            return ";".join((ground, "2", r, g, b))
 
+        return "{};5;{}".format(ground, color_index(color))
+
+    def _set_attrs(self):
+        attrs = [code for code in (self.fg_code, self.bg_code) if code]
         if self.bold:
             attrs.append("01")
-
         if self.underline:
             attrs.append("04")
-
         if self.italic:
             attrs.append("03")
+        return attrs
 
-        return self.escape(attrs)
+    def low_color_string(self):
+        return self.replace(true_color=False).color_str
 
     def true_color_string(self):
-        attrs = []
-        if self.fg:
-            r,g,b = map(str, to_rgb(self.fg))
-            attrs.extend(("38", "2", r, g, b))
-        if self.bg:
-            r,g,b = map(str, to_rgb(self.bg))
-            attrs.extend(("48", "2", r, g, b))
-        if self.bold:
-            attrs.append("01")
-        if self.underline:
-            attrs.append("04")
-        if self.italic:
-            attrs.append("03")
-        return self.escape(attrs)
+        return self.replace(true_color=True).color_str
 
-    def reset_string(self):
+    def _reset_attrs(self):
         """
         tries to minimally reset current terminal state
         ie: only reset fg color and not everything
@@ -115,4 +210,12 @@ class EscapeSequence(object):
 
     @staticmethod
     def full_reset_string():
-        return EscapeSequence(fg=1, bg=1, bold=1).reset_string()
+        return _full_reset
+
+
+_full_reset = EscapeSequence.escape(["39", "49", "00"])
+
+# (EscapeSequence, EscapeSequence) -> result, sequences are interned so
+# identity is equality
+_overlays    = {}
+_transitions = {}
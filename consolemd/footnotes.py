@@ -0,0 +1,48 @@
+"""
+the link destinations listed at the end of a document
+
+a huge document can have hundreds of thousands of links and they all
+have to be kept until the very end, so past max_memory of them they're
+spilled to a temporary file instead of growing without bound
+"""
+
+import tempfile
+
+
+class Footnotes(object):
+
+    def __init__(self, max_memory=4096):
+        self.max_memory = max_memory
+
+        self._memory = []
+        self._spill  = None
+        self._count  = 0
+
+    def append(self, destination):
+        self._count += 1
+
+        if self._spill is not None:
+            self._spill.write(destination + '\n')
+            return
+
+        self._memory.append(destination)
+
+        if len(self._memory) > self.max_memory:
+            self._spill = tempfile.TemporaryFile('w+', encoding='utf-8', errors='surrogateescape')
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        yield from self._memory
+
+        if self._spill is not None:
+            self._spill.seek(0)
+            for line in self._spill:
+                yield line[:-1]
+            self._spill.seek(0, 2)
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
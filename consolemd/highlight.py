@@ -0,0 +1,134 @@
+"""
+syntax highlighting of code blocks via pygments
+
+resolving lexers and formatters by name is surprisingly expensive (and
+raising ClassNotFound even more so) so resolved objects are kept around
+for the life of the process, including "no such lexer" answers
+
+highlight_ahead() spreads the code blocks of big documents over a pool
+of processes, anything smaller than parallel_threshold bytes of code
+isn't worth the trip and is highlighted inline as usual
+"""
+
+import atexit
+import functools
+import concurrent.futures
+
+import pygments
+import pygments.lexers
+import pygments.formatters
+import pygments.util
+
+from .styler import Style
+
+
+@functools.lru_cache(maxsize=64)
+def get_lexer(lang):
+    """
+    return a lexer for lang or None if pygments doesn't know it
+    """
+    try:
+        return pygments.lexers.get_lexer_by_name(lang)
+    except pygments.util.ClassNotFound:
+        return None
+
+
+@functools.lru_cache(maxsize=32)
+def get_formatter(style_name, true_color):
+    style = Style.get_style_by_name(style_name)
+    formatter_name = 'console16m' if true_color else 'console'
+    return pygments.formatters.get_formatter_by_name(formatter_name, style=style)
+
+
+def highlight(code, lang, style_name, true_color):
+    """
+    return code highlighted with terminal escapes, unknown languages are
+    rendered as plain text
+    """
+    lexer = get_lexer(lang or 'text') or get_lexer('text')
+    formatter = get_formatter(style_name, true_color)
+
+    return pygments.highlight(code.encode('utf-8'), lexer, formatter)
+
+
+parallel_threshold = 32 * 1024
+
+# jobs -> ProcessPoolExecutor, kept for the life of the process so only
+# the first big document pays for starting the workers
+_pools = {}
+
+
+class Pending(object):
+    """
+    the highlighted code of one block out of a batch sent to a worker
+    """
+
+    __slots__ = ('future', 'index')
+
+    def __init__(self, future, index):
+        self.future = future
+        self.index = index
+
+    def result(self):
+        return self.future.result()[self.index]
+
+
+def highlight_many(blocks):
+    """
+    highlight [(code, lang, style_name, true_color), ...], runs in a worker
+    """
+    return [highlight(*block) for block in blocks]
+
+
+def process_pool(jobs):
+    try:
+        return _pools[jobs]
+    except KeyError:
+        pool = _pools[jobs] = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+        atexit.register(pool.shutdown)
+        return pool
+
+
+def highlight_ahead(nodes, style_name, true_color, jobs):
+    """
+    start highlighting the code_block nodes with jobs processes and return
+    {node: Pending}, or {} if there isn't enough code to bother
+    """
+    if jobs < 2 or len(nodes) < 2:
+        return {}
+
+    if sum(len(node.literal) for node in nodes) < parallel_threshold:
+        return {}
+
+    pool = process_pool(jobs)
+
+    # a few batches per worker keeps ipc down but still balances the load,
+    # batches are in document order so the first blocks are done first
+    size = -(-len(nodes) // (jobs * 4))
+    pending = {}
+
+    for start in range(0, len(nodes), size):
+        batch = nodes[start:start + size]
+        future = pool.submit(highlight_many, [
+            (node.literal, node.info, style_name, true_color) for node in batch
+        ])
+
+        for index, node in enumerate(batch):
+            pending[node] = Pending(future, index)
+
+    return pending
+
+
+def cache_info():
+    """
+    return the hit/miss counters of the lexer and formatter caches
+    """
+    return {
+        'lexer': get_lexer.cache_info(),
+        'formatter': get_formatter.cache_info(),
+    }
+
+
+def cache_clear():
+    get_lexer.cache_clear()
+    get_formatter.cache_clear()
@@ -0,0 +1,147 @@
+"""
+buffered output for the renderer
+
+rendering produces lots of tiny strings (text, escape sequences, resets)
+and writing each of them straight to the stream means a syscall per node
+when the stream is a pipe or a file. A Writer collects them and passes
+them on according to a flush policy:
+
+* block     - flush after every top level block (the interactive default)
+* threshold - flush once max_bytes are pending or a block finishes more
+              than max_delay seconds after the last flush
+* end       - only flush once everything is rendered
+
+BufferWriter is for rendering into memory, it just collects everything.
+"""
+
+import os
+import time
+
+policies = ('block', 'threshold', 'end')
+
+
+class Writer(object):
+
+    def __init__(self, stream, policy='block', max_bytes=64 * 1024, max_delay=0.25):
+
+        if policy not in policies:
+            raise ValueError("unknown flush policy: {}".format(policy))
+
+        self.stream    = stream
+        self.policy    = policy
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+
+        self._parts = []
+        self._size  = 0
+        self._last_flush = time.monotonic()
+
+        self._raw = None
+        self._encoding = None
+        self._errors = None
+
+        # skip the text layer and hand pre-encoded bytes to the binary
+        # buffer underneath it, unless the text layer translates newlines
+        buffer = getattr(stream, 'buffer', None)
+        encoding = getattr(stream, 'encoding', None)
+
+        if buffer is not None and encoding and os.linesep == '\n':
+            # anything already written through the text layer goes first
+            stream.flush()
+            self._raw = buffer
+            self._encoding = encoding
+            self._errors = getattr(stream, 'errors', None) or 'strict'
+
+    def write(self, text):
+        if not text:
+            return
+
+        self._parts.append(text)
+        self._size += len(text)
+
+        if self.policy == 'threshold' and self._size >= self.max_bytes:
+            self.flush()
+
+    def end_block(self):
+        """
+        called by the renderer every time a top level block is finished
+        """
+        if self.policy == 'block':
+            self.flush()
+        elif self.policy == 'threshold' and self._parts:
+            if time.monotonic() - self._last_flush >= self.max_delay:
+                self.flush()
+
+    def flush(self):
+        if self._parts:
+            data = ''.join(self._parts)
+            self._parts = []
+            self._size = 0
+
+            if self._raw is not None:
+                self._raw.write(data.encode(self._encoding, self._errors))
+            else:
+                self.stream.write(data)
+
+        if self._raw is not None:
+            self._raw.flush()
+        else:
+            self.stream.flush()
+
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """
+        flush everything that is pending, the stream itself is left open
+        """
+        self.flush()
+
+
+class BufferWriter(object):
+
+    def __init__(self):
+        self.parts = []
+
+        # the renderer calls write for every little string, make that the
+        # list's own append instead of a python method around it
+        self.write = self.parts.append
+
+    def end_block(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+    def take(self):
+        """
+        return everything written so far and forget it
+        """
+        data = ''.join(self.parts)
+        del self.parts[:] # keep the list, write is bound to it
+        return data
+
+    def encoded(self, encoding, errors='strict', size=64 * 1024):
+        """
+        yield everything written so far as bytes, about size characters at
+        a time so the whole output never gets joined or encoded in one go
+        """
+        batch = []
+        pending = 0
+
+        for part in self.parts:
+            batch.append(part)
+            pending += len(part)
+
+            if pending >= size:
+                yield ''.join(batch).encode(encoding, errors)
+                batch = []
+                pending = 0
+
+        if batch:
+            yield ''.join(batch).encode(encoding, errors)
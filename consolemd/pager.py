@@ -0,0 +1,592 @@
+"""
+a built-in pager that only renders what's on screen
+
+piping into `less -R` means rendering the whole document before the first
+screen shows up. Instead the source is split into chunks of top level
+blocks (see consolemd.blocks) and a chunk is only parsed and rendered once
+it scrolls into view, its lines are kept for scrolling back. A position is
+a (chunk, line) pair so jumping to the end, or to a heading from the
+outline, never renders anything before it.
+
+every chunk stands on its own so there are two differences from a normal
+render: link reference definitions only apply to their chunk (just like
+--stream) and each chunk lists its links' footnotes right after itself.
+
+    j k, arrows, enter    line down/up
+    space b, pgdn pgup    page down/up
+    d u                   half a page down/up
+    g G, home end         top/bottom
+    ] [                   next/previous heading
+    o                     outline, pick a heading and press enter
+    q                     quit
+"""
+
+import os
+import re
+
+from .blocks import split_blocks
+from .sections import scan_headings
+from .output import BufferWriter
+from .renderer import RenderContext
+
+sgr_re = re.compile(r"\x1b\[([0-9;]*)m")
+
+keys = {
+    'q': 'quit', 'Q': 'quit',
+    'j': 'down', 'e': 'down', '\r': 'down', '\n': 'down', '\x1b[B': 'down', '\x1bOB': 'down',
+    'k': 'up', 'y': 'up', '\x1b[A': 'up', '\x1bOA': 'up',
+    ' ': 'page_down', 'f': 'page_down', '\x1b[6~': 'page_down',
+    'b': 'page_up', '\x1b[5~': 'page_up',
+    'd': 'half_down', 'u': 'half_up',
+    'g': 'home', '<': 'home', '\x1b[H': 'home', '\x1b[1~': 'home', '\x1bOH': 'home',
+    'G': 'end', '>': 'end', '\x1b[F': 'end', '\x1b[4~': 'end', '\x1bOF': 'end',
+    ']': 'next_heading', '[': 'prev_heading',
+    'o': 'outline',
+}
+
+outline_keys = {
+    'q': 'back', 'o': 'back', '\x1b': 'back',
+    'j': 'down', '\x1b[B': 'down', '\x1bOB': 'down',
+    'k': 'up', '\x1b[A': 'up', '\x1bOA': 'up',
+    ' ': 'page_down', '\x1b[6~': 'page_down',
+    'b': 'page_up', '\x1b[5~': 'page_up',
+    'g': 'home', '\x1b[H': 'home', '\x1b[1~': 'home',
+    'G': 'end', '\x1b[F': 'end', '\x1b[4~': 'end',
+    '\r': 'select', '\n': 'select',
+}
+
+
+def standalone(lines):
+    """
+    prefix every line with the escapes still in effect from the lines
+    before it so any line can be drawn on its own
+    """
+    active = ''
+    out = []
+
+    for line in lines:
+        out.append(active + line)
+
+        for match in sgr_re.finditer(line):
+            params = match.group(1).split(';')
+            if any(param in ('', '0', '00') for param in params):
+                # a reset, nothing before it matters any more
+                active = match.group(0)
+            else:
+                active += match.group(0)
+
+    return out
+
+
+class Pages(object):
+    """
+    the lazily rendered lines of a document, in chunks
+    """
+
+    def __init__(self, renderer, text, width=None, **kw):
+        self.renderer = renderer
+        self.width    = width
+        self.options  = kw
+        self.chunks   = list(split_blocks(text.splitlines(True)))
+
+        self._lines    = {}    # chunk: [line, ...]
+        self._anchors  = {}    # chunk: {source line: rendered line}
+        self._outline  = None
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def resize(self, width):
+        """
+        render at a new width from now on
+        """
+        if width != self.width:
+            self.width = width
+            self._lines.clear()
+            self._anchors.clear()
+
+    def update(self, text):
+        """
+        switch to a new version of the document, chunks whose source
+        didn't change keep their rendered lines (and highlighted code)
+        so only what was edited gets rendered again
+        """
+        # a chunk renders the same wherever it is, except the first one
+        # doesn't start with a blank line
+        done = {
+            (self.chunks[chunk], chunk == 0): (lines, self._anchors[chunk])
+            for chunk, lines in self._lines.items()
+        }
+
+        self.chunks   = list(split_blocks(text.splitlines(True)))
+        self._lines   = {}
+        self._anchors = {}
+        self._outline = None
+
+        for chunk, source in enumerate(self.chunks):
+            try:
+                self._lines[chunk], self._anchors[chunk] = done[(source, chunk == 0)]
+            except KeyError:
+                pass
+
+    def rendered(self):
+        """
+        return which chunks have been rendered so far
+        """
+        return sorted(self._lines)
+
+    def lines(self, chunk):
+        """
+        return the rendered lines of chunk, every line starts with the
+        escapes it needs
+        """
+        try:
+            return self._lines[chunk]
+        except KeyError:
+            pass
+
+        writer = BufferWriter()
+        ctx = RenderContext(self.renderer, writer, width=self.width, **self.options)
+
+        # every chunk but the first starts with a blank line, just like
+        # every top level block but the first in a normal render
+        ctx.blocks = 1 if chunk else 0
+
+        document = ctx.parse(self.chunks[chunk])
+        ctx.step(document, True)
+
+        parts = []
+        newlines = 0
+        anchors = {}
+
+        block = document.first_child
+        while block is not None:
+            # where the block starts, past the blank line before it
+            anchors[block.sourcepos[0][0]] = newlines + (1 if ctx.blocks else 0)
+
+            ctx.render_block(block)
+
+            out = writer.take()
+            parts.append(out)
+            newlines += out.count('\n')
+
+            block = block.nxt
+
+        ctx.step(document, False)
+        ctx.writer.close()
+        ctx.footnotes.close()
+        parts.append(writer.take())
+
+        lines = ''.join(parts).split('\n')
+
+        # the text ends with a newline and maybe a reset after it, that's
+        # not a line of its own
+        last = lines.pop()
+        if lines:
+            lines[-1] += last
+
+        lines = standalone(lines)
+
+        self._lines[chunk] = lines
+        self._anchors[chunk] = anchors
+        return lines
+
+    def outline(self):
+        """
+        return [(chunk, source line, level, title), ...] of every heading,
+        from a scan of the source so nothing has to be rendered
+        """
+        if self._outline is None:
+            self._outline = [
+                (chunk, line, level, title)
+                for chunk, source in enumerate(self.chunks)
+                for line, level, title in scan_headings(source)
+            ]
+
+        return self._outline
+
+    def anchor(self, chunk, source_line):
+        """
+        return the position of the block holding source_line of chunk
+        """
+        self.lines(chunk)
+        anchors = self._anchors[chunk]
+
+        starts = [line for line in anchors if line <= source_line]
+        line = anchors[max(starts)] if starts else 0
+
+        # the block may not have rendered a line of its own
+        return self.next((chunk, line - 1)) or self.last()
+
+    def next(self, pos):
+        """
+        return the position of the line after pos, None at the end
+        """
+        chunk, line = pos
+
+        if chunk < len(self) and line + 1 < len(self.lines(chunk)):
+            return (chunk, line + 1)
+
+        for chunk in range(chunk + 1, len(self)):
+            if self.lines(chunk):
+                return (chunk, 0)
+
+        return None
+
+    def previous(self, pos):
+        """
+        return the position of the line before pos, None at the start
+        """
+        chunk, line = pos
+
+        if line > 0:
+            return (chunk, line - 1)
+
+        for chunk in range(chunk - 1, -1, -1):
+            count = len(self.lines(chunk))
+            if count:
+                return (chunk, count - 1)
+
+        return None
+
+    def first(self):
+        return self.next((0, -1))
+
+    def last(self):
+        return self.previous((len(self), 0))
+
+    def forward(self, pos, count):
+        while count > 0:
+            nxt = self.next(pos)
+            if nxt is None:
+                break
+            pos = nxt
+            count -= 1
+        return pos
+
+    def backward(self, pos, count):
+        while count > 0:
+            prev = self.previous(pos)
+            if prev is None:
+                break
+            pos = prev
+            count -= 1
+        return pos
+
+    def screen(self, pos, rows):
+        """
+        return up to rows lines starting at pos
+        """
+        out = []
+
+        while pos is not None and len(out) < rows:
+            chunk, line = pos
+            out.append(self.lines(chunk)[line])
+            pos = self.next(pos)
+
+        return out
+
+
+class Pager(object):
+    """
+    what's on screen and what the keys do, the terminal itself is
+    handled by page()
+    """
+
+    def __init__(self, pages, out, rows, cols):
+        self.pages    = pages
+        self.out      = out
+        self.rows     = rows
+        self.cols     = cols
+        self.top      = pages.first()
+        self.outline  = None   # the selected outline entry while it's shown
+        self.shown    = []     # what each row of the terminal has on it
+
+    @property
+    def height(self):
+        # the last row is the status line
+        return max(1, self.rows - 1)
+
+    def bottom(self):
+        """
+        the furthest down top can go and still fill the screen
+        """
+        return self.pages.backward(self.pages.last(), self.height - 1)
+
+    def scroll(self, count):
+        if self.top is None:
+            return
+
+        if count > 0:
+            self.top = min(self.pages.forward(self.top, count), self.bottom())
+        else:
+            self.top = self.pages.backward(self.top, -count)
+
+    def goto(self, pos):
+        if self.top is not None:
+            self.top = min(pos, self.bottom())
+
+    def current_heading(self):
+        """
+        return the index of the last outline entry at or above the top
+        """
+        current = 0
+        for i, (chunk, line, level, title) in enumerate(self.pages.outline()):
+            if self.top is None or chunk > self.top[0]:
+                break
+            current = i
+        return current
+
+    def update(self, text):
+        """
+        show a new version of the document, staying where we were
+        """
+        self.pages.update(text)
+        self.outline = None
+
+        if self.top is None:
+            self.top = self.pages.first()
+        else:
+            chunk, line = self.top
+            self.top = self.pages.next((chunk, line - 1)) or self.pages.last()
+
+        if self.top is not None:
+            self.top = min(self.top, self.bottom())
+
+    def resize(self, rows, cols, width=None):
+        self.rows  = rows
+        self.cols  = cols
+        self.shown = []
+
+        if self.top is not None and (width or cols) != self.pages.width:
+            # the chunk on top stays on top
+            self.pages.resize(width or cols)
+            self.top = (self.top[0], -1)
+            self.top = self.pages.next(self.top) or self.pages.first()
+
+    def handle(self, key):
+        """
+        act on a key, return False to quit
+        """
+        if self.outline is not None:
+            return self.handle_outline(key)
+
+        action = keys.get(key)
+        page = self.height
+
+        if action == 'quit':
+            return False
+        elif action == 'down':
+            self.scroll(1)
+        elif action == 'up':
+            self.scroll(-1)
+        elif action == 'page_down':
+            self.scroll(page)
+        elif action == 'page_up':
+            self.scroll(-page)
+        elif action == 'half_down':
+            self.scroll(page // 2)
+        elif action == 'half_up':
+            self.scroll(-(page // 2))
+        elif action == 'home':
+            self.top = self.pages.first()
+        elif action == 'end':
+            if self.top is not None:
+                self.top = self.bottom()
+        elif action == 'next_heading':
+            # only render chunks that can hold the next heading
+            for chunk, line, level, title in self.pages.outline():
+                if self.top is not None and chunk >= self.top[0]:
+                    pos = self.pages.anchor(chunk, line)
+                    if pos > self.top:
+                        self.goto(pos)
+                        break
+        elif action == 'prev_heading':
+            for chunk, line, level, title in reversed(self.pages.outline()):
+                if self.top is not None and chunk <= self.top[0]:
+                    pos = self.pages.anchor(chunk, line)
+                    if pos < self.top:
+                        self.goto(pos)
+                        break
+        elif action == 'outline':
+            if self.pages.outline():
+                self.outline = self.current_heading()
+
+        return True
+
+    def handle_outline(self, key):
+        action = outline_keys.get(key)
+        entries = self.pages.outline()
+        page = self.height - 1
+
+        if action == 'back':
+            self.outline = None
+        elif action == 'select':
+            chunk, line, level, title = entries[self.outline]
+            self.goto(self.pages.anchor(chunk, line))
+            self.outline = None
+        elif action == 'down':
+            self.outline += 1
+        elif action == 'up':
+            self.outline -= 1
+        elif action == 'page_down':
+            self.outline += page
+        elif action == 'page_up':
+            self.outline -= page
+        elif action == 'home':
+            self.outline = 0
+        elif action == 'end':
+            self.outline = len(entries) - 1
+
+        if self.outline is not None:
+            self.outline = max(0, min(self.outline, len(entries) - 1))
+
+        return True
+
+    def status(self):
+        if self.outline is not None:
+            return " outline: enter to jump, q to go back"
+
+        if self.top is None:
+            percent = 100
+        elif self.top >= self.bottom():
+            percent = 100
+        else:
+            percent = self.top[0] * 100 // len(self.pages)
+
+        return " {}%  q:quit o:outline ]/[:next/prev heading".format(percent).ljust(self.cols)
+
+    def frame(self):
+        """
+        return the escapes and text that bring the screen up to date
+        """
+        if self.outline is not None:
+            lines = self.outline_lines()
+        else:
+            lines = self.pages.screen(self.top, self.height) if self.top is not None else []
+
+        rows = [
+            lines[row] if row < len(lines) else '~'
+            for row in range(self.height)
+        ]
+        rows.append('\x1b[7m' + self.status()[:self.cols])
+
+        # only rows that changed since the last frame are drawn
+        out = []
+        for row, line in enumerate(rows):
+            if row >= len(self.shown) or self.shown[row] != line:
+                out.append('\x1b[{};1H{}\x1b[0m\x1b[K'.format(row + 1, line))
+
+        self.shown = rows
+        return ''.join(out)
+
+    def outline_lines(self):
+        entries = self.pages.outline()
+        height = self.height
+
+        # keep the selection on screen
+        first = max(0, min(self.outline - height // 2, len(entries) - height))
+
+        lines = []
+        for i in range(first, min(len(entries), first + height)):
+            chunk, line, level, title = entries[i]
+            text = '{}{}'.format('  ' * (level - 1), title)
+            if i == self.outline:
+                text = '\x1b[7m' + text
+            lines.append(text)
+
+        return lines
+
+    def draw(self):
+        self.out.write(self.frame())
+        self.out.flush()
+
+
+def read_key(fd):
+    """
+    return a key, an escape sequence counts as one key
+    """
+    data = os.read(fd, 32).decode('utf-8', 'replace')
+
+    if not data:
+        # the terminal went away
+        return ['q']
+
+    if data.startswith('\x1b') or len(data) <= 1:
+        return [data]
+
+    # typed ahead, or pasted
+    return list(data)
+
+
+def page(renderer, text, width=None, watcher=None, **kw):
+    """
+    show text in the pager until the user quits, return False if there's
+    no terminal to page on (and nothing was shown)
+
+    with a consolemd.watch.Watcher the document is updated every time
+    its file changes
+    """
+    import select
+    import termios
+    import tty
+
+    try:
+        term = open('/dev/tty', 'r+b', buffering=0)
+    except OSError:
+        return False
+
+    with term:
+        fd = term.fileno()
+
+        if not os.isatty(fd):
+            return False
+
+        out = open(fd, 'w', encoding='utf-8', errors='surrogateescape', closefd=False)
+        size = os.get_terminal_size(fd)
+
+        pages = Pages(renderer, text, width or size.columns, **kw)
+        pager = Pager(pages, out, size.lines, size.columns)
+
+        saved = termios.tcgetattr(fd)
+        try:
+            tty.setcbreak(fd)
+            # alternate screen, hide the cursor, don't wrap long lines
+            out.write('\x1b[?1049h\x1b[?25l\x1b[?7l')
+            pager.draw()
+
+            fds = [fd]
+            if watcher is not None and watcher.fileno() is not None:
+                fds.append(watcher.fileno())
+
+            running = True
+            while running:
+                ready, _, _ = select.select(fds, [], [], 0.25)
+
+                if watcher is not None and watcher.changed():
+                    text = watcher.read()
+                    if text is not None:
+                        pager.update(text)
+                        pager.draw()
+
+                now = os.get_terminal_size(fd)
+                if now != size:
+                    size = now
+                    pager.resize(size.lines, size.columns, width)
+                    pager.draw()
+
+                if fd not in ready:
+                    continue
+
+                for key in read_key(fd):
+                    running = pager.handle(key)
+                    if not running:
+                        break
+                else:
+                    pager.draw()
+        finally:
+            out.write('\x1b[0m\x1b[?7h\x1b[?25h\x1b[?1049l')
+            out.flush()
+            termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+    return True
@@ -1,104 +1,444 @@
 import sys
-import re
-import textwrap
+from time import perf_counter
 
-import commonmark
-import pygments
-import pygments.lexers
-import pygments.styles
-import pygments.formatters
-
-from .styler import Styler, Style
-from .escapeseq import EscapeSequence, _true_color
+from .output import Writer, BufferWriter
+from .tracing import EscapeCounter, utf8_len
+from .blocks import split_blocks
+from .dispatch import Dispatcher
+from .wrap import LineWrapper, display_width
+from .footnotes import Footnotes
+from . import escapeseq
+from .escapeseq import EscapeSequence
 
 import logging
 logger = logging.getLogger('consolemd')
 
 endl = '\n'
 
+# nodes that commonmark's walker enters and exits, everything else is a leaf
+containers = frozenset([
+    'document', 'block_quote', 'list', 'item', 'paragraph', 'heading',
+    'emph', 'strong', 'link', 'image', 'custom_inline', 'custom_block',
+])
+
+
+class RenderContext(object):
+    """
+    everything that belongs to a single render: options, output, styler,
+    list counters, footnotes, ... The Renderer itself only holds settings
+    so one can be shared by any number of threads.
+
+    the render loop (parse, step and friends) lives here too, node
+    handlers get the context as their first argument
+    """
+
+    def __init__(self, renderer, writer,
+            style=None, width=None, soft_wrap=True, true_color=None, tracer=None,
+            highlight_jobs=1, plain=False, **kw):
+
+        if true_color is None:
+            true_color = escapeseq._true_color
+
+        self.renderer       = renderer
+        self.style_name     = style or renderer.style_name
+        self.true_color     = bool(true_color)
+        self.width          = width
+        self.soft_wrap      = soft_wrap
+        self.soft_wrap_char = endl if soft_wrap and not width else ' '
+        self.writer         = writer
+        self.wrapper        = None
+
+        if width:
+            # paragraphs get refilled to width as they're written
+            self.writer = self.wrapper = LineWrapper(writer, width)
+
+        self.parser         = renderer.new_parser()
+        self.handlers       = renderer.bind_handlers()
+        self.tracer         = tracer or renderer.tracer
+        self.plain          = plain
+        self.highlight_jobs = 1 if plain else (highlight_jobs or 1)
+        self.blocks         = 0
+        self.list_level     = -1
+        self.counters       = {}
+        self.footnotes      = Footnotes()
+        self.highlighted    = {}
+
+        # tracing and debugging get their own steps so there's no cost
+        # when they're off, not even a logger call
+        if plain:
+            # just the text, no styler or pygments at all
+            self.styler = None
+
+            if self.tracer is None:
+                self.parse, self.step = self.parser.parse, self.text_step
+            else:
+                self.parse, self.step = self.traced_parse, self.traced_text_step
+        elif self.tracer is None:
+            from .styler import Styler
+            self.styler = Styler(self.writer, self.style_name, self.true_color)
+            self.parse = self.parser.parse
+
+            if logger.isEnabledFor(logging.DEBUG):
+                self.step = self.debug_step
+            else:
+                self.step = self.plain_step
+        else:
+            from .styler import Styler
+            self.styler = Styler(EscapeCounter(self.writer), self.style_name, self.true_color)
+            self.parse, self.step = self.traced_parse, self.traced_step
+
+    def highlight_ahead(self, ast):
+        """
+        start highlighting the code blocks of a big ast in a process pool,
+        code_block() collects the results in document order
+        """
+        from .highlight import highlight_ahead
 
-def debug_tag(obj, entering, match):
-    if entering != match:
-        return ''
+        nodes = [obj for obj, entering in ast.walker() if obj.t == 'code_block']
+        self.highlighted.update(
+            highlight_ahead(nodes, self.style_name, self.true_color, self.highlight_jobs)
+        )
+
+    def render_block(self, block):
+        if self.step == self.text_step:
+            self.text_walk(block)
+        else:
+            step = self.step
+
+            for obj, entering in block.walker():
+                step(obj, entering)
+
+        self.blocks += 1
+        if self.styler is not None:
+            if self.tracer is None:
+                self.styler.sync()
+            else:
+                self.traced_sync(block)
+        self.writer.end_block()
+
+    def plain_step(self, obj, entering):
+        """
+        style and render a single step of an ast walk
+        """
+        with self.styler.cm(obj, entering):
+            prefix = self.renderer.prefix(self, obj, entering)
+            self.writer.write(prefix)
+
+            out = self.dispatch(obj, entering)
+            self.writer.write(out)
+
+    def text_step(self, obj, entering):
+        """
+        plain_step() without any styling
+        """
+        write = self.writer.write
+        write(self.renderer.prefix(self, obj, entering))
+        write(self.dispatch(obj, entering))
+
+    def text_walk(self, block):
+        """
+        text_step() every node of block, in the same order as
+        block.walker() but without its overhead
+        """
+        write     = self.writer.write
+        prefix    = self.renderer.prefix
+        handlers  = self.handlers
+        unhandled = self.renderer.unhandled
+
+        obj = block
+        entering = True
+
+        while True:
+            write(prefix(self, obj, entering))
+            write(handlers.get(obj.t, unhandled)(self, obj, entering))
+
+            if entering and obj.t in containers:
+                if obj.first_child is not None:
+                    obj = obj.first_child
+                else:
+                    entering = False
+                continue
+
+            if obj is block:
+                break
+
+            if obj.nxt is not None:
+                obj, entering = obj.nxt, True
+            else:
+                obj, entering = obj.parent, False
+
+    def debug_step(self, obj, entering):
+        """
+        plain_step() that also logs the ast walk as <node> ... </node>
+        """
+        if entering:
+            logger.debug("<%s>", obj.t)
 
-    if entering:
-        return u"<{}>".format(obj.t)
+        self.plain_step(obj, entering)
 
-    return u"</{}>".format(obj.t)
+        if not entering or obj.t in self.styler.no_closing_node:
+            logger.debug("</%s>", obj.t)
 
+    def traced_parse(self, text):
+        start = perf_counter()
+        ast = self.parser.parse(text)
+        self.tracer.parse(perf_counter() - start, utf8_len(text))
+        return ast
+
+    def traced_step(self, obj, entering):
+        """
+        plain_step() but reporting the time and bytes of the styling and
+        the node handler separately to our tracer
+        """
+        tracer   = self.tracer
+        styler   = self.styler
+        escapes  = styler.stream.nbytes
 
-class Renderer:
+        t0 = perf_counter()
+        styler.cm(obj, entering).__enter__()
+        t1 = perf_counter()
 
-    def __init__(self, parser=None, style_name=None):
+        out = self.renderer.prefix(self, obj, entering) + self.dispatch(obj, entering)
+        self.writer.write(out)
 
-        if parser is None:
-            parser = commonmark.Parser()
+        t2 = perf_counter()
+        styler.__exit__(None, None, None)
+        t3 = perf_counter()
+
+        tracer.node(obj.t, entering, t2 - t1, utf8_len(out))
+        tracer.escape(obj.t, entering, (t1 - t0) + (t3 - t2), styler.stream.nbytes - escapes)
+
+    def traced_sync(self, block):
+        """
+        styler.sync() at the end of a block, its escapes are reported as
+        the block's own so the tracer sees every byte of output
+        """
+        styler  = self.styler
+        escapes = styler.stream.nbytes
+
+        start = perf_counter()
+        styler.sync()
+
+        self.tracer.escape(block.t, False, perf_counter() - start, styler.stream.nbytes - escapes)
+
+    def traced_text_step(self, obj, entering):
+        start = perf_counter()
+
+        out = self.renderer.prefix(self, obj, entering) + self.dispatch(obj, entering)
+        self.writer.write(out)
+
+        self.tracer.node(obj.t, entering, perf_counter() - start, utf8_len(out))
+
+    def dispatch(self, obj, entering):
+        return self.handlers.get(obj.t, self.renderer.unhandled)(self, obj, entering)
+
+    def wrap(self, entering):
+        if entering:
+            self.wrapper.start()
+        else:
+            self.wrapper.stop()
+
+
+class Renderer(Dispatcher):
+    """
+    renders markdown to the terminal, a renderer only holds settings so
+    it's safe to share one between threads and concurrent renders
+
+    every render can override the renderer's settings and pick its own
+    width, soft_wrap and true_color, see RenderContext
+    """
+
+    def __init__(self, parser=None, style_name=None, tracer=None):
 
         if style_name is None:
             style_name = 'native'
 
-        self.parser     = parser
+        self._parser    = parser
         self.style_name = style_name
-        self.list_level = -1
-        self.counters   = {}
-        self.footnotes  = []
+        self.tracer     = tracer
+
+    def new_parser(self):
+        """
+        return the parser for one render, commonmark parsers keep state
+        while parsing so each render gets a new one unless a parser was
+        given to us (and then it's on you to not share it between threads)
+        """
+        if self._parser is not None:
+            return self._parser
+
+        # commonmark isn't imported until there's something to parse
+        import commonmark
+        return commonmark.Parser()
 
     def render(self, text, **kw):
-        stream              = kw.get('output', sys.stdout)
-        self.width          = kw.get('width', None)
-        self.soft_wrap      = kw.get('soft_wrap', True)
-        self.soft_wrap_char = endl if self.soft_wrap else ' '
+        """
+        render markdown text to kw['output'] (stdout by default)
 
-        text = self.wrap_paragraphs(text)
+        kw['flush'] is the output flush policy, see consolemd.output
+        kw['tracer'] overrides our tracer, see consolemd.tracing
+        kw['true_color'] overrides consolemd.escapeseq._true_color
+        kw['highlight_jobs'] highlights big documents' code with that many processes
+        kw['plain'] renders just the text without any styling or highlighting
+        """
+        self._render([text], **kw)
 
-        self.styler = Styler(stream, self.style_name)
-        ast = self.parser.parse(text)
+    def render_to_string(self, text, **kw):
+        """
+        return the rendered text as one string instead of writing it to a
+        stream, the other options are the same as render() but there's no
+        output to choose or flush
+        """
+        writer = BufferWriter()
+        self._render([text], writer=writer, **kw)
+        return writer.getvalue()
 
-        for obj, entering in ast.walker():
-            with self.styler.cm(obj, entering):
-                prefix = self.prefix(obj, entering)
-                stream.write(prefix)
+    def render_to_bytes(self, text, buffer=None, encoding='utf-8', **kw):
+        """
+        render_to_string() but encoded. If buffer is given (a bytearray
+        or anything with a write method) the output is added to it and
+        buffer is returned instead.
+        """
+        if buffer is None:
+            return self.render_to_string(text, **kw).encode(encoding, 'surrogateescape')
 
-                logger.debug(debug_tag(obj, entering, True))
+        writer = BufferWriter()
+        self._render([text], writer=writer, **kw)
 
-                out = self.dispatch(obj, entering)
-                stream.write(out)
+        # straight from the rendered parts into buffer, a chunk at a time
+        write = getattr(buffer, 'write', None)
 
-                logger.debug(debug_tag(obj, entering, False))
+        for data in writer.encoded(encoding, 'surrogateescape'):
+            if write is not None:
+                write(data)
+            else:
+                buffer += data
 
-                stream.flush()
+        return buffer
 
-    def dispatch(self, obj, entering):
-        try:
-            handler = getattr(self, obj.t)
-            out = handler(obj, entering)
-            return out
-        except AttributeError:
-            logger.error(u"unhandled ast type: {}".format(obj.t))
+    def render_stream(self, lines, **kw):
+        """
+        render markdown as it arrives, lines is any iterable of lines (eg. a
+        file or stdin) and each top level block is rendered as soon as it's
+        complete instead of after the whole document has been read
 
-        return ''
+        see consolemd.blocks for the one limitation: link reference
+        definitions only apply to the block they're in
+        """
+        self._render(split_blocks(lines), **kw)
 
-    def wrap_paragraphs(self, text):
+    def _render(self, chunks, writer=None, **kw):
         """
-        unfortunately textwrap expects to work on paragraphs, not entire
-        documents. If the user has specified a width then we need to wrap
-        the paragraphs individually before we parse the document.
+        render an iterable of markdown chunks as if they were one document
+        to writer, or to a Writer for kw['output']
         """
-        if not self.width:
-            return text
+        if writer is None:
+            writer = Writer(kw.get('output') or sys.stdout, kw.get('flush') or 'block')
+
+        ctx = RenderContext(self, writer, **kw)
+
+        document = None
+
+        for chunk in chunks:
+            ast = ctx.parse(chunk)
+
+            if ctx.highlight_jobs > 1:
+                ctx.highlight_ahead(ast)
+
+            if document is None:
+                document = ast
+                ctx.step(document, True)
+
+            block = ast.first_child
+
+            while block is not None:
+                ctx.render_block(block)
+
+                # nothing looks at a block once it's rendered, unlinking
+                # it lets it go even while the document is still around
+                nxt = block.nxt
+                block.unlink()
+                block = nxt
+
+        if document is None:
+            document = ctx.parse('')
+            ctx.step(document, True)
+
+        ctx.step(document, False)
+        ctx.writer.close()
+        ctx.footnotes.close()
+
+    async def render_chunks(self, text, executor=None, **kw):
+        """
+        async generator of the rendered text, one chunk per top level block
+
+        parsing and code highlighting run in executor (the loop's default
+        if None) so a big document doesn't stall the event loop, only
+        styling each block happens on the loop
+        """
+        # asyncio takes longer to import than commonmark, only pay for it here
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+
+        writer = BufferWriter()
+        ctx = RenderContext(self, writer, **kw)
+
+        document = await loop.run_in_executor(executor, ctx.parse, text)
+        ctx.step(document, True)
+
+        block = document.first_child
+
+        while block is not None:
+            await self._highlight_block(ctx, block, loop, executor)
+            ctx.render_block(block)
+
+            chunk = writer.take()
+            if chunk:
+                yield chunk
 
-        para_edge = re.compile(r"(\n\s*\n)", re.MULTILINE)
-        paragraphs = para_edge.split(text)
+            nxt = block.nxt
+            block.unlink()
+            block = nxt
 
-        wrapped_lines = []
-        for para in paragraphs:
-            wrapped_lines.append(
-                textwrap.fill(para, width=self.width)
-            )
+        ctx.step(document, False)
+        ctx.writer.close()
+        ctx.footnotes.close()
 
-        return '\n'.join(wrapped_lines)
+        chunk = writer.take()
+        if chunk:
+            yield chunk
 
-    def prefix(self, obj, entering):
+    async def render_async(self, text, stream, encoding='utf-8', **kw):
+        """
+        render text to an asyncio.StreamWriter a block at a time, waiting
+        for the client to drain() after every block
+        """
+        async for chunk in self.render_chunks(text, **kw):
+            stream.write(chunk.encode(encoding, 'surrogateescape'))
+            await stream.drain()
+
+    async def _highlight_block(self, ctx, block, loop, executor):
+        """
+        highlight the code blocks in block in executor, code_block() picks
+        up the results
+        """
+        if ctx.plain:
+            return
+
+        from .highlight import highlight
+
+        for obj, entering in block.walker():
+            if obj.t == 'code_block':
+                ctx.highlighted[obj] = await loop.run_in_executor(
+                    executor, highlight,
+                    obj.literal, obj.info, ctx.style_name, ctx.true_color,
+                )
+
+    def unhandled(self, ctx, obj, entering):
+        logger.error("unhandled ast type: %s", obj.t)
+        return ''
+
+    def prefix(self, ctx, obj, entering):
         """
         having newlines before text blocks is problematic, this function
         tries to catch those corner cases
@@ -112,149 +452,185 @@ class Renderer:
         # if our parent is the document the prefix a newline
         if obj.parent.t == 'document':
             # don't prefix the very first one though
-            if obj.parent.first_child != obj:
+            if ctx.blocks:
                 return endl
 
         return ''
 
-    def document(self, obj, entering):
-        if entering:
+    def document(self, ctx, obj, entering):
+        if entering or not len(ctx.footnotes):
             return ''
-        else:
-            formatted_footnotes = []
-            for i, footnote in enumerate(self.footnotes):
-                i += 1
 
-                f = u"[{}] - {}".format(i, footnote)
-                formatted_footnotes.append(f)
+        # there can be hundreds of thousands of footnotes, write them as we
+        # go instead of building one huge string
+        write = ctx.writer.write
+        write(endl)
+        nbytes = len(endl)
 
-            if formatted_footnotes:
-                return endl + endl.join(formatted_footnotes) + endl
+        for i, footnote in enumerate(ctx.footnotes, 1):
+            line = u"[{}] - {}".format(i, footnote) + endl
+            write(line)
 
-            return ''
+            if ctx.tracer is not None:
+                nbytes += utf8_len(line)
+
+            if i % 1024 == 0:
+                # let the writer pass them on like any other block
+                ctx.writer.end_block()
+
+        if ctx.tracer is not None:
+            # they never pass through traced_step, the time is already
+            # part of the document node's
+            ctx.tracer.node('footnotes', entering, 0.0, nbytes)
+
+        return ''
+
+    def paragraph(self, ctx, obj, entering):
+        if ctx.wrapper is not None:
+            ctx.wrap(entering)
 
-    def paragraph(self, obj, entering):
         if entering:
             return ''
         else:
             return endl
 
-    def text(self, obj, entering):
+    def text(self, ctx, obj, entering):
         return obj.literal
 
-    def linebreak(self, obj, entering):
+    def linebreak(self, ctx, obj, entering):
         return endl
 
-    def softbreak(self, obj, entering):
-        return self.soft_wrap_char
+    def softbreak(self, ctx, obj, entering):
+        return ctx.soft_wrap_char
 
-    def thematic_break(self, obj, entering):
-        width = self.width if self.width else 75
+    def thematic_break(self, ctx, obj, entering):
+        width = ctx.width if ctx.width else 75
         return u"{}".format('—' * width) + endl
 
-    def emph(self, obj, entering):
+    def emph(self, ctx, obj, entering):
         return ''
 
-    def strong(self, obj, entering):
+    def strong(self, ctx, obj, entering):
         return ''
 
-    def heading(self, obj, entering):
+    def heading(self, ctx, obj, entering):
+        if ctx.wrapper is not None:
+            ctx.wrap(entering)
+
         if entering:
             level = 1 if obj.level is None else obj.level
             return u"{} ".format('#' * level)
         else:
             return endl
 
-    def list(self, obj, entering):
+    def list(self, ctx, obj, entering):
         if entering:
-            self.list_level += 1
+            ctx.list_level += 1
         else:
-            self.list_level -= 1
+            ctx.list_level -= 1
 
         if obj.list_data['type'] == 'ordered':
             if entering:
                 # item nodes will increment this
                 start = obj.list_data['start'] - 1
-                self.counters[ tuple(obj.sourcepos[0]) ] = start
+                ctx.counters[ tuple(obj.sourcepos[0]) ] = start
             else:
-                del self.counters[ tuple(obj.sourcepos[0]) ]
+                del ctx.counters[ tuple(obj.sourcepos[0]) ]
 
         return ''
 
-    def item(self, obj, entering):
+    def item(self, ctx, obj, entering):
         if entering:
             if obj.list_data['type'] == 'ordered':
                 key = tuple(obj.parent.sourcepos[0])
-                self.counters[key] += 1
-                num = self.counters[key]
+                ctx.counters[key] += 1
+                num = ctx.counters[key]
                 bullet_char = u"{}.".format(num)
             else:
                 bullet_char = obj.list_data.get('bullet_char') or '*' # -,+,*
 
-            text = u"{}{} ".format(' ' * self.list_level * 2, bullet_char)
-            eseq = self.styler.style.entering('bullet')
+            text = u"{}{} ".format(' ' * ctx.list_level * 2, bullet_char)
+
+            if ctx.wrapper is not None:
+                # wrapped lines line up with the text after the bullet
+                ctx.wrapper.indent(display_width(text))
+
+            if ctx.styler is None:
+                return text
 
-            return self.styler.stylize(eseq, text)
+            eseq = ctx.styler.style.entering('bullet')
+            return ctx.styler.stylize(eseq, text)
+
+        if ctx.wrapper is not None:
+            ctx.wrapper.dedent()
 
         return ''
 
-    def code(self, obj, entering):
+    def code(self, ctx, obj, entering):
         # backticks
         return obj.literal
 
-    def code_block(self, obj, entering):
-        # farm out code highlighting to pygments
+    def code_block(self, ctx, obj, entering):
+        if ctx.plain:
+            # what's left of pygments' output once the escapes are gone,
+            # its lexers drop leading and trailing newlines (stripnl) and
+            # trailing spaces stay since the escapes come after them
+            return obj.literal.strip('\n') + endl
+
+        # farm out code highlighting to pygments, which is only imported
+        # once a document actually has a code block
+        from .highlight import highlight
+
         # note: unfortunately you can't set your own background color
         # because after the first token the color codes would get reset
 
-        try:
-            lang  = obj.info or 'text'
-            lexer = pygments.lexers.get_lexer_by_name(lang)
-            style = Style.get_style_by_name(self.style_name)
-        except pygments.util.ClassNotFound: # lang is unknown to pygments
-            lang  = 'text'
-            lexer = pygments.lexers.get_lexer_by_name(lang)
-            style = Style.get_style_by_name(self.style_name)
-
-        formatter_name = 'console16m' if _true_color else 'console'
-        formatter = pygments.formatters.get_formatter_by_name(formatter_name, style=style)
-
-        highlighted = u"{}{}".format(
-            pygments.highlight(obj.literal.encode('utf-8'), lexer, formatter).rstrip(),
-            EscapeSequence.full_reset_string() + endl,
-        )
-        eseq = EscapeSequence(bg="#202020")
+        if obj in ctx.highlighted:
+            # already done (or started) off the event loop by
+            # render_chunks() or in a process pool by highlight_ahead()
+            code = ctx.highlighted.pop(obj)
+
+            if not isinstance(code, str):
+                code = code.result()
+        elif ctx.tracer is None:
+            code = highlight(obj.literal, obj.info, ctx.style_name, ctx.true_color)
+        else:
+            start = perf_counter()
+            code = highlight(obj.literal, obj.info, ctx.style_name, ctx.true_color)
+            ctx.tracer.highlight(obj.info, perf_counter() - start, utf8_len(code))
+
+        highlighted = code.rstrip() + EscapeSequence.full_reset_string()
+        eseq = EscapeSequence(bg="#202020", true_color=ctx.true_color)
 
-        return self.styler.stylize(eseq, highlighted)
+        return ctx.styler.stylize(eseq, highlighted, reset=True) + endl
 
-    def block_quote(self, obj, entering):
+    def block_quote(self, ctx, obj, entering):
         # has text children
         return ''
 
-    def link(self, obj, entering):
+    def link(self, ctx, obj, entering):
         if entering:
-            self.footnotes.append(obj.destination)
+            ctx.footnotes.append(obj.destination)
             return ''
         else:
-            return u"[{}]".format(len(self.footnotes))
+            return u"[{}]".format(len(ctx.footnotes))
 
-    def image(self, obj, entering):
+    def image(self, ctx, obj, entering):
         if entering:
-            self.footnotes.append(obj.destination)
+            ctx.footnotes.append(obj.destination)
             return '<image:'
         else:
-            return u">[{}]".format(len(self.footnotes))
+            return u">[{}]".format(len(ctx.footnotes))
 
-    def html_inline(self, obj, entering):
+    def html_inline(self, ctx, obj, entering):
         if obj.literal.lower() in ['<br>', '<br/>']:
             return endl
 
         return obj.literal
 
-    def html_block(self, obj, entering):
+    def html_block(self, ctx, obj, entering):
         logger.warning("ignoring html_block")
         return ''
 
-        renderer = Renderer(self.parser, self.style_name)
+        renderer = Renderer(self._parser, ctx.style_name)
         renderer.render(obj.literal[4:-3])
         return ''
@@ -0,0 +1,239 @@
+"""
+find a document's headings without parsing it
+
+scanning the source line by line for top level headings (and link
+reference definitions) is much cheaper than parsing, and it's enough to
+print an outline or to cut a single section out of a huge document so
+only that section gets parsed and rendered. With --cache the scan is
+kept in the cache next to the rendered output.
+"""
+
+import os
+import re
+import json
+
+from .blocks import RawBlocks, list_re
+
+atx_re       = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+|$)(.*?)(?:[ \t]+#+)?[ \t]*$")
+setext_re    = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+thematic_re  = re.compile(r"^ {0,3}([-*_])([ \t]*\1){2,}[ \t]*$")
+reference_re = re.compile(r"^ {0,3}\[(?:[^\]\\]|\\.)+\]:")
+link_re      = re.compile(r"!?\[([^\]]*)\](?:\([^)]*\)|\[[^\]]*\])?")
+markup_re    = re.compile(r"[*_`]")
+
+index_version = 1
+
+
+def scan(text):
+    """
+    return (headings, references) of markdown text: headings are
+    [(offset, line, level, title), ...] of every top level heading, where
+    offset is where its first line starts in text and line is 1-based.
+    references are [(start, end), ...] of link reference definitions.
+    """
+    headings = []
+    references = []
+
+    raw = RawBlocks()
+    previous = None   # (offset, text) of the last line if it could be a setext heading's text
+    para = False      # was the last line part of a paragraph
+    offset = 0
+
+    for number, line in enumerate(text.splitlines(True), 1):
+        start = offset
+        offset += len(line)
+        stripped = line.strip()
+
+        if raw.inside(line):
+            continue
+
+        if not stripped:
+            previous, para = None, False
+            continue
+
+        if raw.opens(line):
+            previous, para = None, False
+            continue
+
+        match = atx_re.match(line)
+        if match:
+            headings.append((start, number, len(match.group(1)), match.group(2).strip()))
+            previous, para = None, False
+            continue
+
+        match = setext_re.match(line)
+        if match and previous:
+            level = 1 if match.group(1)[0] == '=' else 2
+            headings.append((previous[0], number - 1, level, previous[1]))
+            previous, para = None, False
+            continue
+
+        if thematic_re.match(line):
+            previous, para = None, False
+            continue
+
+        # a definition can't interrupt a paragraph
+        if not para and reference_re.match(line):
+            references.append((start, offset))
+            continue
+
+        text_line = not line.startswith('    ') and stripped[0] != '>' \
+                and not list_re.match(stripped)
+
+        if not text_line:
+            previous = None
+        elif not para:
+            # a setext heading takes the whole paragraph, keep where it started
+            previous = (start, stripped)
+
+        para = True
+
+    return headings, references
+
+
+def scan_headings(text):
+    """
+    return [(line, level, title), ...] of the top level headings in text
+    """
+    return [(line, level, title) for offset, line, level, title in scan(text)[0]]
+
+
+def plain_title(title):
+    """
+    title without inline markup or extra spaces
+    """
+    return ' '.join(markup_re.sub('', link_re.sub(r'\1', title)).split())
+
+
+class Index(object):
+    """
+    the headings and link reference definitions of a document
+    """
+
+    def __init__(self, headings, references):
+        self.headings   = headings
+        self.references = references
+
+    @classmethod
+    def scan(cls, text):
+        return cls(*scan(text))
+
+    def to_json(self):
+        return json.dumps(dict(
+            version=index_version, headings=self.headings, references=self.references,
+        ))
+
+    @classmethod
+    def from_json(cls, data):
+        """
+        return the Index saved by to_json, None if it's from another version
+        """
+        data = json.loads(data)
+
+        if data.get('version') != index_version:
+            return None
+
+        return cls(
+            [tuple(heading) for heading in data['headings']],
+            [tuple(reference) for reference in data['references']],
+        )
+
+    def find(self, title):
+        """
+        return the index of the heading called title, ignoring case and
+        markup, failing that the first one containing title, None if
+        there's no such heading
+        """
+        wanted = plain_title(title).casefold()
+        titles = [plain_title(heading[3]).casefold() for heading in self.headings]
+
+        for i, candidate in enumerate(titles):
+            if candidate == wanted:
+                return i
+
+        for i, candidate in enumerate(titles):
+            if wanted in candidate:
+                return i
+
+        return None
+
+    def span(self, i):
+        """
+        return (start, end) of the section under heading i, it runs up to
+        the next heading of the same or a higher level
+        """
+        offset, line, level, title = self.headings[i]
+
+        for other in self.headings[i+1:]:
+            if other[2] <= level:
+                return offset, other[0]
+
+        return offset, None
+
+    def section(self, text, title):
+        """
+        return the markdown of the section called title, raises KeyError if
+        there's no such section. Link reference definitions from the rest
+        of the document come along so the section's links still work.
+        """
+        i = self.find(title)
+        if i is None:
+            raise KeyError(title)
+
+        start, end = self.span(i)
+        if end is None:
+            end = len(text)
+
+        section = text[start:end]
+
+        outside = [
+            text[ref_start:ref_end] for ref_start, ref_end in self.references
+            if ref_start < start or ref_start >= end
+        ]
+
+        if outside:
+            section = section.rstrip('\n') + '\n\n' + ''.join(
+                line if line.endswith('\n') else line + '\n' for line in outside
+            )
+
+        return section
+
+    def outline(self):
+        """
+        return the headings as an indented table of contents
+        """
+        if not self.headings:
+            return ''
+
+        top = min(heading[2] for heading in self.headings)
+
+        return ''.join(
+            '{}{}\n'.format('  ' * (level - top), plain_title(title))
+            for offset, line, level, title in self.headings
+        )
+
+
+def index_path():
+    from .cache import default_path
+    return os.path.join(os.path.dirname(default_path()), 'index')
+
+
+def load_index(text, cache=None):
+    """
+    return the Index of text, from cache (a RenderCache) if it's there
+    """
+    if cache is None:
+        return Index.scan(text)
+
+    key = cache.key(text, index=index_version)
+    data = cache.get(key)
+
+    if data is not None:
+        index = Index.from_json(data.decode('utf-8'))
+        if index is not None:
+            return index
+
+    index = Index.scan(text)
+    cache.put(key, index.to_json().encode('utf-8'))
+
+    return index
@@ -0,0 +1,172 @@
+"""
+a long lived rendering process for when consolemd is started over and over
+(eg. as a pager or previewer) and python startup dominates the run time
+
+the server imports and warms up everything once, then forks a child per
+request so every render starts out warm and can't affect the next one.
+consolemd.client talks to it over a unix socket:
+
+    request:  one line of json options, then the markdown until EOF
+    response: one status line, "ok" or "error: <message>", then the output
+"""
+
+import os
+import io
+import sys
+import json
+import signal
+import socket
+import socketserver
+
+import click
+
+from .client import socket_path, private_dir
+
+import logging
+logger = logging.getLogger('consolemd')
+
+warmup = """\
+# warmup
+
+*text* **text** `code` [link](http://example.com)
+
+1. item
+
+```python
+def f(): pass
+```
+"""
+
+
+class RenderHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        from .styler import Style
+
+        try:
+            options = json.loads(self.rfile.readline().decode('utf-8'))
+            text = self.rfile.read().decode('utf-8')
+        except ValueError as e:
+            self.wfile.write("error: bad request: {}\n".format(e).encode('utf-8'))
+            return
+
+        style = options.get('style') or 'native'
+
+        if Style.find_style(style) is None:
+            self.wfile.write("error: invalid style name: {}\n".format(style).encode('utf-8'))
+            return
+
+        self.wfile.write(b"ok\n")
+
+        out = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+        renderer = self.server.renderer(style)
+        renderer.render(
+            text,
+            output     = out,
+            width      = options.get('width'),
+            soft_wrap  = options.get('soft_wrap', True),
+            true_color = bool(options.get('true_color', True)),
+            plain      = bool(options.get('plain', False)),
+            flush      = 'threshold',
+        )
+        out.detach()
+
+
+class RenderServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+
+    def __init__(self, path):
+        self.path = path
+
+        self.remove_stale(path)
+
+        # only we get to talk to our server
+        umask = os.umask(0o077)
+        try:
+            super(RenderServer, self).__init__(path, RenderHandler)
+        finally:
+            os.umask(umask)
+
+    @staticmethod
+    def remove_stale(path):
+        """
+        remove a socket left behind by a dead server, fail if one is alive
+        """
+        if not os.path.exists(path):
+            return
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except OSError:
+            os.unlink(path)
+        else:
+            raise OSError("a server is already listening on {}".format(path))
+        finally:
+            sock.close()
+
+    def renderer(self, style):
+        # renderers are cheap, it's the imports and caches behind them
+        # (styles, lexers, formatters, colors) that we keep warm
+        from .renderer import Renderer
+        return Renderer(style_name=style)
+
+    def warmup(self, style):
+        """
+        import and cache everything a typical render needs, forked
+        children inherit all of it
+        """
+        for true_color in (True, False):
+            self.renderer(style).render_to_string(warmup, true_color=true_color)
+
+    def server_close(self):
+        super(RenderServer, self).server_close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def serve(path=None, style='native'):
+    if path is None:
+        path = socket_path()
+        if not os.environ.get('CONSOLEMD_SOCKET'):
+            private_dir(os.path.dirname(path))
+
+    server = RenderServer(path)
+    server.warmup(style)
+
+    # make sure `kill` cleans up the socket too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    logger.info("listening on %s", path)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.option('--socket', 'path',
+        default=None,
+        help="unix socket to listen on (def: $XDG_RUNTIME_DIR/consolemd.sock)")
+@click.option('-s', '--style',
+        type=str, default=os.environ.get('CONSOLEMD_STYLE', 'native'),
+        help="pygments style to warm up (def: native)")
+def main(path, style):
+    """
+    keep a warm renderer around for consolemd-client
+    """
+    from .logger import create_logger
+    create_logger('consolemd')
+
+    try:
+        serve(path, style)
+    except OSError as e:
+        raise click.ClickException(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
-import copy
+import functools
 
 import pygments.styles
+import pygments.util
 from pygments import token
 
+from . import escapeseq
 from .escapeseq import EscapeSequence
+from .dispatch import Dispatcher
 from .colormap import reshade
 
 import logging
@@ -26,8 +29,9 @@ class Style(object):
 
     plain = EscapeSequence()
 
-    def __init__(self, style_name):
+    def __init__(self, style_name, true_color=None):
         self.pyg_style = Style.get_style_by_name(style_name)
+        self.true_color = true_color
 
         f = self.eseq_from_pygments # shortcut
 
@@ -43,15 +47,44 @@ class Style(object):
             'bullet':       (f(token.Literal         , solarized['bullet'])      , None) ,
                 }
 
+        # make each heading level a bit darker
+        heading = self.entering('heading')
+        self.headings = {
+            level: heading.replace( fg=reshade(heading.fg, 1.0 - .10 * (level-1)) )
+            for level in range(1, 7)
+        }
+
         #print self.styles
 
     @staticmethod
-    def get_style_by_name(style_name):
+    @functools.lru_cache(maxsize=None)
+    def cached(style_name, true_color):
+        """
+        return the shared Style for style_name at a color depth, styles
+        never change once built so every render can use the same one
+        """
+        return Style(style_name, true_color)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def find_style(style_name):
+        """
+        return the pygments style called style_name or None
+        """
         try:
             return pygments.styles.get_style_by_name(style_name)
         except pygments.util.ClassNotFound:
+            return None
+
+    @staticmethod
+    def get_style_by_name(style_name):
+        style = Style.find_style(style_name)
+
+        if style is None:
             logger.error("no such style: %s", style_name)
-            return pygments.styles.get_style_by_name('native')
+            return Style.find_style('native')
+
+        return style
 
     def eseq_from_pygments(self, token, default=''):
         value = self.pyg_style.styles.get(token, '') or default
@@ -76,6 +109,7 @@ class Style(object):
                 bold      = 'bold' in values,
                 underline = 'underline' in values,
                 italic    = 'italic' in values,
+                true_color = self.true_color,
                 )
 
     def entering(self, key):
@@ -84,8 +118,15 @@ class Style(object):
     def exiting(self, key):
         return self.styles.get(key, (None,None))[1] or self.entering(key)
 
+    def heading(self, level):
+        try:
+            return self.headings[level]
+        except KeyError:
+            heading = self.entering('heading')
+            return heading.replace( fg=reshade(heading.fg, max(0.0, 1.0 - .10 * (level-1))) )
+
 
-class Styler(object):
+class Styler(Dispatcher):
 
     no_closing_node = [
             'text', 'code', 'code_block',
@@ -93,13 +134,20 @@ class Styler(object):
             'html_inline', 'html_block',
             ]
 
-    def __init__(self, stream, style_name):
+    def __init__(self, stream, style_name, true_color=None):
+
+        if true_color is None:
+            true_color = escapeseq._true_color
 
         self.stream = stream
         self.style_name = style_name
-        self.style = Style(style_name)
+        self.style = Style.cached(style_name, bool(true_color))
+        self.handlers = self.bind_handlers()
 
+        # every node's style on top of its parents', and what the
+        # terminal has actually been sent so far
         self._stack = []
+        self.current = Style.plain
         self._curr_call = None
 
     def cm(self, obj, entering):
@@ -116,35 +164,52 @@ class Styler(object):
 
         if entering:
             eseq = self.dispatch( obj, entering )
-            self.push( eseq )
-            self.stream.write( eseq.color_string() )
+            parent = self._stack[-1] if self._stack else Style.plain
+            self.push( parent.overlay(eseq) )
+
+        # something is about to be written so the terminal has to catch up
+        self.sync()
 
     def __exit__(self, exc_type, exc_value, traceback):
         obj, entering = self._curr_call
         self._curr_call = None
 
+        # nothing is written until the next node needs it, if that node
+        # has the same style then nothing is written at all
         if not entering or obj.t in Styler.no_closing_node:
-            eseq = self._stack.pop()
-            self.stream.write( eseq.reset_string() )
+            self._stack.pop()
 
-            if obj.t != 'document':
-                eseq = self._stack[-1]
-                self.stream.write( eseq.color_string() )
-            else:
+            if obj.t == 'document':
                 assert len(self._stack) == 0, "missed an ast type in no_closing_node"
+                self.sync()
+
+    def sync(self):
+        """
+        send the terminal whatever it takes to get to the current style
+        """
+        eseq = self._stack[-1] if self._stack else Style.plain
 
-    def __getattr__(self, name):
-        from functools import partial
-        return partial(self._default, name)
+        if eseq is not self.current:
+            self.stream.write( self.current.transition(eseq) )
+            self.current = eseq
 
-    @staticmethod
-    def stylize( eseq, text ):
-        return u"{}{}{}".format(eseq.color_string(), text, eseq.reset_string())
+    def stylize(self, eseq, text, reset=False):
+        """
+        return text in eseq (on top of the current style) and the escapes
+        to get back to the current style afterwards
+
+        reset means text ends with a full reset of its own, eg. pygments output
+        """
+        styled = self.current.overlay(eseq)
+        after = Style.plain if reset else styled
+
+        return u"{}{}{}".format(
+            self.current.transition(styled), text, after.transition(self.current)
+        )
 
     def _default(self, name, obj, entering):
         """
-        __getattr__ returns this function if a specific/overriding method
-        is not provided in this class
+        style any node type without a specific/overriding method
         """
         if entering:
             return self.style.entering(name)
@@ -162,18 +227,16 @@ class Styler(object):
         """
         returns an EscapeSequence object
         """
-        handler = getattr(self, obj.t)
+        handler = self.handlers.get(obj.t)
+
+        if handler is None:
+            return self._default(obj.t, obj, entering)
+
         return handler(obj, entering)
 
     def heading(self, obj, entering):
         """
-        do specialized styling for headers, make each heading level a bit darker
+        do specialized styling for headers, each level is a bit darker
         """
-        eseq = copy.deepcopy( self.style.entering('heading') )
-        color = eseq.fg
-
         level = 1 if obj.level is None else obj.level
-        per = 1.0 - .10 * (level-1)
-        eseq.fg = reshade(color, per)
-
-        return eseq
+        return self.style.heading(level)
@@ -0,0 +1,117 @@
+"""
+opt-in instrumentation of the render loop
+
+pass a Tracer to Renderer (or to a single render() call) and it gets told
+how long every parse, node handler, styling step and pygments highlight
+took and how many bytes each produced. Without a tracer none of this code
+runs at all, the renderer uses its plain loop.
+
+Stats is a Tracer that just adds everything up, subclass Tracer to send
+the numbers somewhere else (statsd, prometheus, logs, ...).
+"""
+
+
+def utf8_len(text):
+    return len(text.encode('utf-8', 'surrogateescape'))
+
+
+class Tracer(object):
+    """
+    base class, every hook does nothing so only override what you need
+    """
+
+    def parse(self, seconds, nbytes):
+        """
+        a chunk of nbytes of markdown was parsed
+        """
+
+    def node(self, node_type, entering, seconds, nbytes):
+        """
+        the renderer's handler for node_type ran and produced nbytes,
+        for code blocks this includes the highlighting
+        """
+
+    def escape(self, node_type, entering, seconds, nbytes):
+        """
+        the styler entered/exited node_type and wrote nbytes of escapes
+        """
+
+    def highlight(self, lang, seconds, nbytes):
+        """
+        pygments highlighted a code block in lang and produced nbytes
+        """
+
+
+class Stats(Tracer):
+    """
+    totals of count, seconds and bytes for each kind of event, node
+    handlers are further split by node type
+    """
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, key, seconds, nbytes):
+        try:
+            total = self.totals[key]
+        except KeyError:
+            total = self.totals[key] = [0, 0.0, 0]
+
+        total[0] += 1
+        total[1] += seconds
+        total[2] += nbytes
+
+    def parse(self, seconds, nbytes):
+        self.add('parse', seconds, nbytes)
+
+    def node(self, node_type, entering, seconds, nbytes):
+        self.add('node:' + node_type, seconds, nbytes)
+
+    def escape(self, node_type, entering, seconds, nbytes):
+        self.add('escape', seconds, nbytes)
+
+    def highlight(self, lang, seconds, nbytes):
+        self.add('highlight', seconds, nbytes)
+
+    def seconds(self, prefix):
+        """
+        total seconds of every key starting with prefix
+        """
+        return sum(
+            total[1] for key, total in self.totals.items()
+            if key.startswith(prefix)
+        )
+
+    def as_dict(self):
+        return {
+            key: dict(count=count, seconds=seconds, bytes=nbytes)
+            for key, (count, seconds, nbytes) in self.totals.items()
+        }
+
+    def report(self):
+        """
+        return a human readable table, slowest first
+        """
+        lines = ["{:<22} {:>8} {:>10} {:>10}".format('event', 'count', 'ms', 'bytes')]
+
+        for key, (count, seconds, nbytes) in sorted(
+                self.totals.items(), key=lambda item: -item[1][1]):
+            lines.append("{:<22} {:>8} {:>10.2f} {:>10}".format(
+                key, count, seconds * 1000, nbytes
+            ))
+
+        return '\n'.join(lines)
+
+
+class EscapeCounter(object):
+    """
+    sits between the styler and the output to count the escapes it writes
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.nbytes = 0
+
+    def write(self, text):
+        self.nbytes += utf8_len(text)
+        self.stream.write(text)
@@ -0,0 +1,174 @@
+"""
+render a file again every time it's saved
+
+the file is shown in the pager (see consolemd.pager) which keeps the
+rendered lines of each chunk of top level blocks. When the file changes
+the chunks whose source is the same keep their lines, highlighted code
+and all, so only edited chunks get rendered again (and only once they're
+on screen) and only the rows of the terminal that changed are redrawn.
+
+changes are noticed with inotify on linux, anywhere else the file is
+checked a few times a second
+"""
+
+import os
+import time
+import select
+import struct
+
+IN_CLOSE_WRITE = 0x08
+IN_MOVED_TO    = 0x80
+
+# struct inotify_event, followed by len bytes of name
+event_header = struct.Struct('iIII')
+
+
+def inotify_watch(directory, mask):
+    """
+    return an inotify file descriptor watching directory, None if there's
+    no inotify
+    """
+    import ctypes
+    import ctypes.util
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        init = libc.inotify_init1
+        add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+    fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+
+    if add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+
+    return fd
+
+
+class Watcher(object):
+
+    def __init__(self, path, interval=0.25, use_inotify=True):
+        self.path     = os.path.abspath(path)
+        self.name     = os.path.basename(self.path)
+        self.interval = interval
+        self.text     = None
+
+        # editors often save by writing a new file and renaming it over
+        # the old one so watch the directory, not the file
+        self._fd = None
+        if use_inotify:
+            self._fd = inotify_watch(os.path.dirname(self.path), IN_CLOSE_WRITE | IN_MOVED_TO)
+
+        self._stat = self.stat()
+
+    def fileno(self):
+        """
+        return a file descriptor that's readable once the file changed, None
+        when polling
+        """
+        return self._fd
+
+    def stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def changed(self):
+        """
+        return True if the file may have changed since we last asked
+        """
+        if self._fd is None:
+            stat = self.stat()
+            if stat == self._stat:
+                return False
+            self._stat = stat
+            return True
+
+        changed = False
+
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = event_header.unpack_from(data, offset)
+                offset += event_header.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+
+                if os.fsdecode(name) == self.name:
+                    changed = True
+
+        return changed
+
+    def wait(self):
+        """
+        block until the file may have changed
+        """
+        while True:
+            if self._fd is not None:
+                select.select([self._fd], [], [])
+            else:
+                time.sleep(self.interval)
+
+            if self.changed():
+                return
+
+    def read(self):
+        """
+        return the file's text if it's different from the last read, None
+        if it's the same or can't be read right now (eg. halfway through a save)
+        """
+        try:
+            with open(self.path, encoding='utf-8', errors='surrogateescape') as fh:
+                text = fh.read()
+        except OSError:
+            return None
+
+        if text == self.text:
+            return None
+
+        self.text = text
+        return text
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def watch(renderer, path, **kw):
+    """
+    show path in the pager and keep it up to date until the user quits,
+    without a terminal the whole file is rendered again after every change
+    """
+    from .pager import page
+
+    watcher = Watcher(path)
+
+    try:
+        text = watcher.read() or ''
+
+        if page(renderer, text, watcher=watcher, **kw):
+            return
+
+        while True:
+            renderer.render(text, **kw)
+
+            text = None
+            while text is None:
+                watcher.wait()
+                text = watcher.read()
+    finally:
+        watcher.close()
@@ -0,0 +1,156 @@
+"""
+wrap rendered text to a width
+
+LineWrapper sits between the renderer and its Writer. The renderer turns
+wrapping on for the inline text of paragraphs and headings and everything
+else (code blocks, bullets, footnotes, ...) passes straight through. Widths
+are measured on the rendered text so escape sequences take up no room and
+wide characters take up two columns. Lines wrapped inside list items are
+indented to line up with the text after the bullet.
+"""
+
+import re
+import unicodedata
+
+# escape sequence, newline, spaces, anything else
+token_re  = re.compile(r"(\x1b\[[0-9;]*[A-Za-z])|(\n)|( +)|([^\x1b\n ]+|\x1b)")
+escape_re = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+_width_cache = {}
+
+
+def char_width(ch):
+    """
+    return the number of terminal columns ch takes up
+    """
+    try:
+        return _width_cache[ch]
+    except KeyError:
+        pass
+
+    if unicodedata.combining(ch) or unicodedata.category(ch) in ('Mn', 'Me', 'Cf'):
+        width = 0
+    elif unicodedata.east_asian_width(ch) in ('W', 'F'):
+        width = 2
+    else:
+        width = 1
+
+    _width_cache[ch] = width
+    return width
+
+
+def display_width(text):
+    """
+    return the number of terminal columns text takes up, escape sequences
+    take up none
+    """
+    if '\x1b' in text:
+        text = escape_re.sub('', text)
+
+    if text.isascii():
+        return len(text)
+
+    return sum(char_width(ch) for ch in text)
+
+
+class LineWrapper(object):
+
+    def __init__(self, stream, width):
+        self.stream   = stream
+        self.width    = width
+        self.wrapping = False
+        self.col      = 0   # columns already written on the current line
+        self.indents  = [0]
+
+        # the last word (and the spaces before it) is held back until we
+        # know whether it fits on the current line
+        self.space      = ''
+        self.word       = []
+        self.word_width = 0
+
+    def start(self):
+        """
+        start wrapping everything written
+        """
+        self.wrapping = True
+
+    def stop(self):
+        """
+        place whatever is held back and stop wrapping
+        """
+        self._place()
+        self.wrapping = False
+
+    def indent(self, width):
+        """
+        wrapped lines start at column width until dedent()
+        """
+        self.indents.append(width)
+
+    def dedent(self):
+        self.indents.pop()
+
+    def write(self, text):
+        if not self.wrapping:
+            self.stream.write(text)
+
+            i = text.rfind('\n')
+            if i < 0:
+                self.col += display_width(text)
+            else:
+                self.col = display_width(text[i+1:])
+            return
+
+        for escape, newline, space, word in token_re.findall(text):
+            if word:
+                self.word.append(word)
+                self.word_width += display_width(word)
+            elif space:
+                if self.word:
+                    self._place()
+                self.space += space
+            elif escape:
+                if self.word or self.space:
+                    self.word.append(escape)
+                else:
+                    self.stream.write(escape)
+            else:
+                self._place()
+                self.stream.write(newline)
+                self.col = 0
+
+    def _place(self):
+        """
+        write the held back word, on a new line if it doesn't fit on this one
+        """
+        word = ''.join(self.word)
+
+        if not self.word_width:
+            # only escapes (or nothing), trailing spaces aren't worth keeping
+            self.stream.write(word)
+        else:
+            indent = self.indents[-1]
+
+            # never wrap a word that's first on its line, it won't fit anywhere
+            if self.col > indent and self.col + len(self.space) + self.word_width > self.width:
+                self.stream.write('\n' + ' ' * indent + word)
+                self.col = indent + self.word_width
+            else:
+                self.stream.write(self.space + word)
+                self.col += len(self.space) + self.word_width
+
+        self.space      = ''
+        self.word       = []
+        self.word_width = 0
+
+    def end_block(self):
+        self._place()
+        self.stream.end_block()
+
+    def flush(self):
+        self._place()
+        self.stream.flush()
+
+    def close(self):
+        self._place()
+        self.stream.close()
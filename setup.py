@@ -38,6 +38,8 @@ setup(
     name=pkg_name,
     packages=[pkg_name],
 
+    python_requires='>=3.7',
+
     install_requires=[
         'click',
         'pygments',
@@ -56,6 +58,8 @@ setup(
     entry_points='''
         [console_scripts]
         consolemd=consolemd.cli:cli
+        consolemd-server=consolemd.server:main
+        consolemd-client=consolemd.client:main
     ''',
 
     # metadata for upload to PyPI
@@ -76,6 +80,8 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.7",
         "Topic :: Software Development :: Documentation",
         "Topic :: Software Development :: Libraries :: Python Modules",
         "Topic :: Terminals",
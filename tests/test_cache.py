@@ -0,0 +1,70 @@
+import io
+import os
+
+from consolemd import Renderer
+from consolemd.cache import RenderCache, render_cached
+
+
+def test_key_depends_on_options():
+    cache = RenderCache('unused')
+    key = cache.key("# hi", style='native', width=None)
+    assert key == cache.key("# hi", width=None, style='native')
+    assert key != cache.key("# hi", style='monokai', width=None)
+    assert key != cache.key("# hi", style='native', width=40)
+    assert key != cache.key("# ho", style='native', width=None)
+
+
+def test_hit_skips_rendering(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    text = open('README.md').read()
+
+    first = io.StringIO()
+    render_cached(cache, Renderer, text, output=first)
+
+    class Exploding(Renderer):
+        def render(self, text, **kw):
+            raise AssertionError("cache miss")
+
+    second = io.StringIO()
+    render_cached(cache, Exploding, text, output=second)
+
+    assert second.getvalue() == first.getvalue()
+
+
+def test_lru_eviction(tmp_path):
+    cache = RenderCache(str(tmp_path), max_size=250)
+
+    keys = [cache.key(str(i)) for i in range(4)]
+
+    for i, key in enumerate(keys):
+        cache.put(key, b'x' * 100)
+        # make the write order unambiguous for mtime based eviction
+        os.utime(cache._entry(key), (i, i))
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) == b'x' * 100
+    assert cache.get(keys[3]) == b'x' * 100
+
+
+def test_puts_only_scan_when_full(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path), max_size=1000)
+
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, '_entries', lambda: scans.append(1) or entries())
+
+    for i in range(9):
+        cache.put(cache.key(str(i)), b'x' * 100)
+
+    # once to find out the size of what's already there
+    assert len(scans) == 1
+
+    # replacing an entry doesn't count twice
+    cache.put(cache.key('0'), b'y' * 100)
+    assert len(scans) == 1
+
+    cache.put(cache.key('9'), b'x' * 100)
+    cache.put(cache.key('10'), b'x' * 100)
+    assert len(scans) == 2
+    assert sum(size for _, size, _ in entries()) <= 1000
@@ -45,3 +45,105 @@ def test_pipe_stdin(script_runner):
     assert ret.success
     assert ret.stdout == input + '\n'
     assert ret.stderr == ''
+
+
+@pytest.mark.parametrize('policy', ['block', 'threshold', 'end'])
+def test_flush_policy(script_runner, policy):
+    default = script_runner.run('consolemd', 'README.md')
+    ret = script_runner.run('consolemd', '--flush', policy, 'README.md')
+    assert ret.success
+    assert ret.stdout == default.stdout
+
+
+def test_multiple_files_in_order(script_runner, tmp_path):
+    paths = []
+    for i in range(6):
+        path = tmp_path / "doc{}.md".format(i)
+        path.write_text("document number {}\n".format(i))
+        paths.append(str(path))
+
+    ret = script_runner.run('consolemd', '-j', '3', *paths)
+    assert ret.success
+    assert ret.stdout == ''.join("document number {}\n".format(i) for i in range(6))
+
+    glob = str(tmp_path / "doc*.md")
+    assert script_runner.run('consolemd', glob).stdout == ret.stdout
+
+
+def test_output_dir(script_runner, tmp_path):
+    out = tmp_path / 'out'
+    ret = script_runner.run('consolemd', '-j', '2', '--output-dir', str(out), 'README.md', 'CHANGELOG.md')
+    assert ret.success
+    assert ret.stdout == ''
+    assert "ConsoleMD renders markdown" in (out / 'README.txt').read_text()
+    assert (out / 'CHANGELOG.txt').exists()
+
+
+def test_outline_and_section(script_runner):
+    ret = script_runner.run('consolemd', '--outline', 'README.md')
+    assert ret.success
+    assert ret.stdout.startswith("ConsoleMD\n  Python 3\n")
+
+    ret = script_runner.run('consolemd', '--section', 'python 3', 'README.md')
+    assert ret.success
+    assert "Python3 only" in ret.stdout
+    assert "Installation" not in ret.stdout
+
+
+def test_stdin_with_other_files(script_runner, tmp_path):
+    path = tmp_path / 'doc.md'
+    path.write_text("file doc\n")
+
+    ret = script_runner.run('consolemd', '-j', '2', '-', str(path), stdin=StringIO("stdin doc\n"))
+    assert ret.success
+    assert ret.stdout == "stdin doc\nfile doc\n"
+
+    ret = script_runner.run('consolemd', '--output-dir', str(tmp_path / 'out'), '-', str(path),
+            stdin=StringIO("stdin doc\n"))
+    assert not ret.success
+    assert "stdin (-)" in ret.stderr
+    assert not (tmp_path / 'out').exists()
+
+
+def test_output_dir_keeps_paths_apart(script_runner, tmp_path):
+    for name in ('a', 'b'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'README.md').write_text("readme {}\n".format(name))
+
+    out = tmp_path / 'out'
+    ret = script_runner.run('consolemd', '--output-dir', str(out),
+            str(tmp_path / 'a' / 'README.md'), str(tmp_path / 'b' / 'README.md'))
+    assert ret.success
+    assert (out / 'a' / 'README.txt').read_text() == "readme a\n"
+    assert (out / 'b' / 'README.txt').read_text() == "readme b\n"
+
+    (tmp_path / 'a' / 'README.markdown').write_text("other\n")
+    ret = script_runner.run('consolemd', '--output-dir', str(out),
+            str(tmp_path / 'a' / 'README.md'), str(tmp_path / 'a' / 'README.markdown'))
+    assert not ret.success
+    assert "would both be written to" in ret.stderr
+
+
+def test_file_that_looks_like_a_glob(script_runner, tmp_path):
+    path = tmp_path / 'notes[1].md'
+    path.write_text("first notes\n")
+
+    ret = script_runner.run('consolemd', str(path))
+    assert ret.success
+    assert ret.stdout == "first notes\n"
+
+
+@pytest.mark.parametrize('option', [
+    ['--outline'], ['--section', 'x'], ['--pager'], ['--stream'], ['--trace'], ['--flush', 'end'],
+])
+def test_single_input_options_refuse_many(script_runner, option):
+    ret = script_runner.run('consolemd', *option, 'README.md', 'CHANGELOG.md')
+    assert not ret.success
+    assert "only works with a single INPUT" in ret.stderr
+    assert ret.stdout == ''
+
+
+def test_watch_refuses_outline(script_runner):
+    ret = script_runner.run('consolemd', '--watch', '--outline', 'README.md')
+    assert not ret.success
+    assert "--watch can't be combined" in ret.stderr
@@ -0,0 +1,40 @@
+import random
+
+from consolemd.colormap import (
+    ColorMap, ansicolors, closest_color, color_index, _scan_closest,
+)
+
+
+def sample_colors():
+    # a coarse grid over the whole cube, the table itself and some noise
+    step = range(0, 256, 17)
+    for r in step:
+        for g in step:
+            for b in step:
+                yield r, g, b
+
+    for rgb in ColorMap.xterm_colors:
+        yield rgb
+
+    rand = random.Random(1234)
+    for _ in range(2000):
+        yield rand.randrange(256), rand.randrange(256), rand.randrange(256)
+
+
+def test_closest_color_matches_scan():
+    for rgb in sample_colors():
+        assert closest_color(*rgb) == _scan_closest(*rgb), rgb
+
+    # second time around is answered from the cache
+    for rgb in sample_colors():
+        assert closest_color(*rgb) == _scan_closest(*rgb), rgb
+
+
+def test_color_index_matches_scan():
+    for name, value in ansicolors.items():
+        r, g, b = (int(value[i:i+2], 16) for i in (1, 3, 5))
+        assert color_index(name) == _scan_closest(r, g, b)
+        assert ColorMap(name).color == _scan_closest(r, g, b)
+
+    assert color_index('#fe348c') == _scan_closest(0xfe, 0x34, 0x8c)
+    assert color_index('#nothex') == _scan_closest(0, 0, 0)
@@ -0,0 +1,53 @@
+import copy
+import pytest
+
+from consolemd.escapeseq import EscapeSequence
+
+
+def test_interned():
+    a = EscapeSequence(fg='#ansired', bold=True, true_color=True)
+    b = EscapeSequence(fg='#ff0000', bold=1, true_color=True)
+    assert a is b
+    assert copy.deepcopy(a) is a
+    assert a is not EscapeSequence(fg='#ff0000', bold=True, true_color=False)
+
+
+def test_immutable():
+    eseq = EscapeSequence(fg='#ff0000', true_color=True)
+
+    with pytest.raises(AttributeError):
+        eseq.fg = '#00ff00'
+
+    other = eseq.replace(fg='#00ff00')
+    assert other.fg == '#00ff00'
+    assert eseq.fg == '#ff0000'
+
+
+def test_precomputed_strings():
+    eseq = EscapeSequence(fg='#ff0000', bg='#000000', italic=True, true_color=True)
+    assert eseq.color_str == "\x1b[38;2;255;0;0;48;2;0;0;0;03m"
+    assert eseq.reset_str == "\x1b[39;49;00m"
+
+    eseq = EscapeSequence(fg='#ff0000', true_color=False)
+    assert eseq.color_str == "\x1b[38;5;9m"
+    assert eseq.reset_str == "\x1b[39m"
+    assert EscapeSequence().color_str == ''
+
+    # no color means no color, not black
+    assert EscapeSequence(fg='', italic=True, true_color=False).color_str == "\x1b[03m"
+
+
+def test_transition():
+    plain = EscapeSequence(true_color=True)
+    red   = EscapeSequence(fg='#ff0000', true_color=True)
+    bold  = EscapeSequence(bold=True, true_color=True)
+
+    red_bold = red.overlay(bold)
+    assert red_bold is EscapeSequence(fg='#ff0000', bold=True, true_color=True)
+    assert red.overlay(plain) is red
+
+    assert red.transition(red) == ''
+    assert plain.transition(red) == red.color_str
+    assert red_bold.transition(red) == "\x1b[22m"
+    assert red.transition(bold) == "\x1b[0;01m" # shorter than 39;01
+    assert red_bold.transition(plain) == "\x1b[0m"
@@ -0,0 +1,51 @@
+from consolemd.footnotes import Footnotes
+
+
+def test_spills_in_order():
+    footnotes = Footnotes(max_memory=3)
+    urls = ['http://example.com/{}'.format(i) for i in range(10)]
+
+    for url in urls:
+        footnotes.append(url)
+
+    assert footnotes._spill is not None
+    assert len(footnotes) == 10
+    assert list(footnotes) == urls
+
+    footnotes.append('http://example.com/last')
+    assert list(footnotes) == urls + ['http://example.com/last']
+
+    footnotes.close()
+
+
+def test_writing_footnotes_in_bounded_memory():
+    import tracemalloc
+
+    from consolemd import Renderer
+    from consolemd.output import Writer
+    from consolemd.renderer import RenderContext
+
+    class Sink(object):
+        def write(self, text):
+            pass
+
+        def flush(self):
+            pass
+
+    ctx = RenderContext(Renderer(), Writer(Sink(), 'threshold'))
+    document = ctx.parse('')
+    ctx.step(document, True)
+
+    for i in range(100000):
+        ctx.footnotes.append('http://example.com/{}'.format(i))
+
+    tracemalloc.start()
+    try:
+        ctx.step(document, False)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        ctx.footnotes.close()
+
+    # all of them formatted would be several megabytes
+    assert peak < 512 * 1024
@@ -0,0 +1,23 @@
+from consolemd import highlight
+
+
+def test_cache_counters():
+    highlight.cache_clear()
+
+    for _ in range(3):
+        highlight.highlight("x = 1\n", 'python', 'native', True)
+        highlight.highlight("zzz\n", 'nosuchlang', 'native', True)
+
+    info = highlight.cache_info()
+
+    # python, nosuchlang and the text fallback
+    assert info['lexer'].misses == 3
+    assert info['lexer'].hits == 6
+    assert info['formatter'].misses == 1
+    assert info['formatter'].hits == 5
+
+
+def test_unknown_language_is_plain_text():
+    assert highlight.get_lexer('nosuchlang') is None
+    out = highlight.highlight("zzz\n", 'nosuchlang', 'native', True)
+    assert out == highlight.highlight("zzz\n", 'text', 'native', True)
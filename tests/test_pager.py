@@ -0,0 +1,116 @@
+import io
+import re
+
+from consolemd import Renderer
+from consolemd.pager import Pages, Pager, standalone
+
+escape_re = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def plain(text):
+    return escape_re.sub('', text)
+
+
+def document(sections=50):
+    out = []
+    for i in range(sections):
+        out.append('# Section {}\n\nsome *text* for section {}\n\n- a\n- b\n'.format(i, i))
+    return '\n'.join(out)
+
+
+def test_pages_match_render():
+    text = open('README.md').read()
+    text = re.sub(r"\]\([^)]*\)", ']', text) # no links, they're footnoted per chunk
+
+    out = io.StringIO()
+    Renderer().render_stream(io.StringIO(text), output=out, width=60)
+
+    pages = Pages(Renderer(), text, 60)
+    lines = [line for chunk in range(len(pages)) for line in pages.lines(chunk)]
+
+    assert [plain(line) for line in lines] == plain(out.getvalue()).rstrip('\n').split('\n')
+
+
+def test_footnotes_follow_their_chunk():
+    pages = Pages(Renderer(), "one [a](http://a)\n\ntwo [b](http://b)\n")
+
+    assert plain(pages.lines(1)[-1]) == "[1] - http://b"
+    assert pages.rendered() == [1]
+
+
+def test_end_only_renders_the_end():
+    pages = Pages(Renderer(), document(), 40)
+    pager = Pager(pages, io.StringIO(), 10, 40)
+
+    pager.handle('G')
+
+    # the first screen and the last one
+    assert pages.rendered()[0] == 0
+    assert pages.rendered()[1] > len(pages) - 10
+    assert plain(pages.screen(pager.top, 9)[-1]) == '- b'
+
+
+def test_outline_jumps_to_heading():
+    pages = Pages(Renderer(), document(), 40)
+    pager = Pager(pages, io.StringIO(), 10, 40)
+
+    assert len(pages.outline()) == 50
+
+    pager.handle('o')
+    for key in 'jjj\r':
+        pager.handle(key)
+
+    assert pager.outline is None
+    assert plain(pages.screen(pager.top, 1)[0]) == '# Section 3'
+
+    pager.handle(']')
+    assert plain(pages.screen(pager.top, 1)[0]) == '# Section 4'
+
+    pager.handle('[')
+    pager.handle('[')
+    assert plain(pages.screen(pager.top, 1)[0]) == '# Section 2'
+
+
+def test_scroll_stays_on_document():
+    pages = Pages(Renderer(), document(3), 40)
+    pager = Pager(pages, io.StringIO(), 5, 40)
+
+    pager.handle('k')
+    assert pager.top == pages.first()
+
+    for _ in range(100):
+        pager.handle(' ')
+    assert pager.top == pager.bottom()
+    assert len(pages.screen(pager.top, pager.height)) == pager.height
+
+    assert pager.handle('q') is False
+
+
+def test_standalone_lines_carry_their_style():
+    lines = standalone(['\x1b[1mbold', 'still\x1b[0m', 'plain'])
+
+    assert lines == ['\x1b[1mbold', '\x1b[1mstill\x1b[0m', '\x1b[0mplain']
+
+
+def test_update_only_renders_what_changed():
+    text = document(5)
+    pages = Pages(Renderer(), text, 40)
+    before = [pages.lines(chunk) for chunk in range(len(pages))]
+
+    pages.update(text.replace('section 3', 'section three'))
+
+    assert pages.rendered() == [c for c in range(len(pages)) if c != 10]
+    assert all(pages.lines(c) == before[c] for c in range(len(pages)) if c != 10)
+    assert 'section three' in plain(pages.lines(10)[1])
+
+
+def test_frame_only_draws_changed_rows():
+    text = document(5)
+    pager = Pager(Pages(Renderer(), text, 40), io.StringIO(), 10, 40)
+
+    assert pager.frame().count('\x1b[K') == 10
+    assert pager.frame() == ''
+
+    pager.update(text.replace('section 0', 'section zero'))
+
+    assert pager.frame().count('\x1b[K') == 1
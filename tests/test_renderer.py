@@ -0,0 +1,270 @@
+import io
+import re
+
+import pytest
+
+from consolemd import Renderer
+
+
+doc = """\
+# Title
+
+Some *emph* and **strong** and `code` [link](http://a) ![img](http://b)
+
+1. one
+2. two
+
+3. three
+   - nested
+
+
+   more of three
+
+    indented code
+
+```python
+def f(x):
+
+    return x
+```
+
+<!--
+
+comment
+
+-->
+
+> quote [again](http://c)
+
+para
+"""
+
+
+def render(text, **kw):
+    out = io.StringIO()
+    Renderer().render(text, output=out, **kw)
+    return out.getvalue()
+
+
+def render_stream(text, **kw):
+    out = io.StringIO()
+    Renderer().render_stream(io.StringIO(text), output=out, **kw)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize('text', [doc, open('README.md').read(), ''])
+def test_stream_matches_render(text):
+    assert render_stream(text) == render(text)
+
+
+def test_indented_fence_doesnt_close_code():
+    text = "```\nexample:\n    ```\n\nstill code\n```\n\nafter\n"
+    assert render_stream(text) == render(text)
+
+
+def test_tracer_sees_everything():
+    from consolemd.tracing import Stats
+
+    stats = Stats()
+    assert render(doc, tracer=stats) == render(doc)
+
+    totals = stats.as_dict()
+    assert totals['parse']['bytes'] == len(doc.encode('utf-8'))
+    assert totals['highlight']['count'] == 1
+    assert totals['node:code_block']['count'] == 1
+    assert totals['node:link']['count'] == 4 # entering and exiting twice
+    assert totals['escape']['bytes'] > 0
+
+
+def test_tracer_counts_every_byte():
+    from consolemd.tracing import Stats
+
+    for text in [doc, re.sub(r"\]\([^)]*\)", ']', doc)]: # with and without footnotes
+        stats = Stats()
+        out = render(text, tracer=stats)
+
+        traced = sum(
+            total['bytes'] for key, total in stats.as_dict().items()
+            if key.startswith('node:') or key == 'escape'
+        )
+        assert traced == len(out.encode('utf-8'))
+
+
+def test_no_logging_unless_debugging(monkeypatch):
+    import consolemd.renderer
+
+    calls = []
+    monkeypatch.setattr(consolemd.renderer.logger, 'debug', lambda *args: calls.append(args))
+
+    render(doc)
+    assert calls == []
+
+    monkeypatch.setattr(consolemd.renderer.logger, 'isEnabledFor', lambda level: True)
+
+    render("# hi\n")
+    assert calls == [("<%s>", 'document'), ("<%s>", 'heading'), ("<%s>", 'text'),
+                     ("</%s>", 'text'), ("</%s>", 'heading'), ("</%s>", 'document')]
+
+
+def strip(text):
+    return re.sub(r"\x1b\[[0-9;]*m", '', text)
+
+
+def test_width():
+    text = doc + "\n- " + "word " * 30 + "\n"
+    lines = strip(render(text, width=30)).splitlines()
+
+    # the code block is untouched and the list item is indented
+    assert "    return x" in lines
+    assert lines[-10:-7] == ["- word word word word word", "  word word word word word", "  word word word word word"]
+
+    assert max(len(line) for line in lines if not line.startswith('[')) <= 30
+
+    assert render_stream(text, width=30) == render(text, width=30)
+
+
+def test_minimal_escapes():
+    from consolemd.styler import Style
+
+    heading = Style('native').entering('heading')
+    out = render("# one *two* three\n")
+
+    # the heading's color is only sent once, *two* just turns italic on and off
+    assert out.count(heading.color_str) == 1
+    assert "\x1b[03mtwo\x1b[23m three" in out
+    assert out.endswith("three\n\x1b[0m")
+
+
+def test_register_handler():
+    class Shouty(Renderer):
+        pass
+
+    Shouty.register('text', lambda renderer, ctx, obj, entering: obj.literal.upper())
+
+    out = io.StringIO()
+    Shouty().render("some *text*\n", output=out)
+    assert strip(out.getvalue()) == "SOME TEXT\n"
+    assert strip(render("some *text*\n")) == "some text\n"
+
+
+def test_handler_errors_arent_hidden():
+    class Buggy(Renderer):
+        def emph(self, ctx, obj, entering):
+            return obj.no_such_attribute
+
+    with pytest.raises(AttributeError):
+        Buggy().render("*text*\n", output=io.StringIO())
+
+
+def test_render_to_string_and_bytes():
+    expected = render(doc, width=40)
+
+    assert Renderer().render_to_string(doc, width=40) == expected
+    assert Renderer().render_to_bytes(doc, width=40) == expected.encode('utf-8')
+
+    buffer = bytearray(b'> ')
+    assert Renderer().render_to_bytes(doc, buffer=buffer, width=40) is buffer
+    assert buffer == b'> ' + expected.encode('utf-8')
+
+    buffer = io.BytesIO()
+    Renderer().render_to_bytes(doc, buffer=buffer, width=40)
+    assert buffer.getvalue() == expected.encode('utf-8')
+
+
+def test_render_to_bytes_writes_in_chunks():
+    text = "\n".join("para {} with ümlauts and *emph*\n".format(i) for i in range(10000))
+    expected = Renderer().render_to_bytes(text, width=40)
+
+    class Buffer(io.BytesIO):
+        writes = 0
+
+        def write(self, data):
+            self.writes += 1
+            return super(Buffer, self).write(data)
+
+    buffer = Buffer()
+    Renderer().render_to_bytes(text, buffer=buffer, width=40)
+
+    assert buffer.getvalue() == expected
+    assert len(expected) > 64 * 1024
+    assert 1 < buffer.writes < 100
+
+
+def test_render_async():
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    class Stream(io.BytesIO):
+        drains = 0
+
+        async def drain(self):
+            self.drains += 1
+
+    async def collect():
+        return [chunk async for chunk in Renderer().render_chunks(doc)]
+
+    async def to_stream(stream, executor):
+        await Renderer().render_async(doc, stream, executor=executor)
+
+    expected = render(doc)
+
+    chunks = asyncio.run(collect())
+    assert ''.join(chunks) == expected
+    assert len(chunks) == 8 # 7 top level blocks and the footnotes
+
+    stream = Stream()
+    with ThreadPoolExecutor(1) as executor:
+        asyncio.run(to_stream(stream, executor))
+
+    assert stream.getvalue() == expected.encode('utf-8')
+    assert stream.drains == len(chunks)
+
+
+def test_renders_dont_share_state():
+    renderer = Renderer()
+    assert renderer.render_to_string(doc) == renderer.render_to_string(doc)
+
+
+def test_shared_between_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    options = [
+        dict(width=width, true_color=true_color, style=style)
+        for width in (None, 20, 40)
+        for true_color in (True, False)
+        for style in ('native', 'monokai')
+    ] * 4
+
+    expected = [Renderer().render_to_string(doc, **kw) for kw in options]
+    assert len(set(expected)) == len(options) // 4
+
+    renderer = Renderer()
+    with ThreadPoolExecutor(8) as pool:
+        results = pool.map(lambda kw: renderer.render_to_string(doc, **kw), options)
+
+    assert list(results) == expected
+
+
+def test_parallel_highlighting(monkeypatch):
+    import consolemd.highlight
+
+    text = doc + "\n- list\n\n  ```c\n  int x;\n  ```\n\n~~~\nplain\n~~~\n"
+    expected = render(text)
+
+    # too little code to bother with the pool
+    assert render(text, highlight_jobs=2) == expected
+    assert consolemd.highlight._pools == {}
+
+    monkeypatch.setattr(consolemd.highlight, 'parallel_threshold', 0)
+    assert render(text, highlight_jobs=2) == expected
+    assert 2 in consolemd.highlight._pools
+
+
+@pytest.mark.parametrize('width', [None, 30])
+@pytest.mark.parametrize('text', [doc, open('README.md').read(), "```python\nx = 1   \n```\n"])
+def test_plain_is_the_text_without_escapes(text, width):
+    styled = Renderer().render_to_string(text, width=width)
+    plain = Renderer().render_to_string(text, width=width, plain=True)
+
+    assert '\x1b' not in plain
+    assert plain == re.sub(r"\x1b\[[0-9;]*m", '', styled)
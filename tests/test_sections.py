@@ -0,0 +1,99 @@
+import io
+
+from consolemd import Renderer
+from consolemd.cache import RenderCache
+from consolemd.sections import Index, load_index, scan_headings
+
+doc = """\
+# Intro
+
+1. one
+2. two
+
+## Setup [guide][g]
+
+3. three
+4. four
+
+```
+# not a heading
+```
+
+Details
+=======
+
+### More
+
+# Troubleshooting
+
+* it broke
+
+[g]: http://guide
+"""
+
+
+def render(text):
+    out = io.StringIO()
+    Renderer().render(text, output=out, true_color=False)
+    return out.getvalue()
+
+
+def test_scan_headings():
+    source = "# one #\n\ntwo\n===\n\n```\n# not\n```\n\n- item\n---\n\n    # code\n## three\n\n---\n"
+
+    assert scan_headings(source) == [(1, 1, 'one'), (3, 1, 'two'), (14, 2, 'three')]
+
+
+def test_no_headings_in_code_with_indented_fences():
+    source = "```\n    ```\n# not\n```\n\n~~~\n```\n# not\n~~~~ \n# real\n"
+
+    assert scan_headings(source) == [(10, 1, 'real')]
+
+
+def test_no_headings_in_html():
+    source = "<div>\n# not\n</div>\n\n<!--\n\n# not\n-->\n<pre>\n# not\n</pre>\n# real\n"
+
+    assert scan_headings(source) == [(12, 1, 'real')]
+
+
+def test_section_runs_to_the_next_heading_of_its_level():
+    section = Index.scan(doc).section(doc, 'details')
+    assert section.startswith('Details\n=======\n\n### More')
+
+    section = Index.scan(doc).section(doc, 'setup guide')
+
+    assert section.startswith('## Setup')
+    assert 'not a heading' in section
+    assert 'Details' not in section
+
+    # the definition from the end of the document came along
+    out = render(section)
+    assert '[1] - http://guide' in out
+    assert '3. ' in out and '4. ' in out
+
+
+def test_section_matches_part_of_a_title():
+    assert Index.scan(doc).section(doc, 'trouble') == "# Troubleshooting\n\n* it broke\n\n[g]: http://guide\n"
+
+
+def test_missing_section():
+    try:
+        Index.scan(doc).section(doc, 'nope')
+    except KeyError:
+        pass
+    else:
+        assert False, "found a missing section"
+
+
+def test_outline():
+    assert Index.scan(doc).outline() == "Intro\n  Setup guide\nDetails\n    More\nTroubleshooting\n"
+
+
+def test_cached_index(tmp_path):
+    cache = RenderCache(str(tmp_path))
+
+    index = load_index(doc, cache)
+    cached = load_index(doc, cache)
+
+    assert cached.headings == index.headings
+    assert cached.references == index.references
@@ -0,0 +1,74 @@
+import os
+import threading
+
+import pytest
+
+from consolemd.client import connect, private_dir
+from consolemd.server import RenderServer
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="server needs fork")
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / 'consolemd.sock')
+    server = RenderServer(path)
+    server.warmup('native')
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    yield path
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def run_both(script_runner, socket, *args):
+    env = dict(os.environ, CONSOLEMD_SOCKET=socket)
+    client = script_runner.run(['consolemd-client'] + list(args), env=env)
+    local = script_runner.run(['consolemd'] + list(args))
+    return client, local
+
+
+def test_client_matches_cli(script_runner, server):
+    for args in [('README.md',), ('--no-true-color', '-w', '30', 'README.md')]:
+        client, local = run_both(script_runner, server, *args)
+        assert client.success
+        assert client.stdout == local.stdout
+
+
+def test_client_bad_style(script_runner, server):
+    client, _ = run_both(script_runner, server, '-s', 'nosuchstyle', 'README.md')
+    assert not client.success
+    assert 'invalid style name' in client.stderr
+
+
+def test_client_without_server(script_runner, tmp_path):
+    client, local = run_both(script_runner, str(tmp_path / 'nothing.sock'), 'README.md')
+    assert client.success
+    assert client.stdout == local.stdout
+
+
+def test_client_refuses_others_socket(server, monkeypatch, capsys):
+    sock = connect(server)
+    assert sock is not None
+    sock.close()
+
+    uid = os.getuid()
+    monkeypatch.setattr(os, 'getuid', lambda: uid + 1)
+
+    assert connect(server) is None
+    assert "isn't ours" in capsys.readouterr().err
+
+
+def test_private_dir(tmp_path):
+    path = str(tmp_path / 'run')
+
+    assert private_dir(path) == path
+    assert os.stat(path).st_mode & 0o777 == 0o700
+
+    os.chmod(path, 0o755)
+    with pytest.raises(OSError):
+        private_dir(path)
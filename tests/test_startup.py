@@ -0,0 +1,86 @@
+import os
+import re
+import sys
+import subprocess
+
+# generous so slow CI machines don't fail, the point is to catch somebody
+# importing pygments/commonmark at module level again (~3x the cost)
+budget_ms = float(os.environ.get('CONSOLEMD_IMPORT_BUDGET_MS', 150))
+
+
+def run(code):
+    ret = subprocess.run(
+        [sys.executable, '-c', code],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+        check=True,
+    )
+    return ret
+
+
+def heavy_modules(code):
+    ret = run(code + "\nimport sys\nprint(' '.join(sorted(sys.modules)))")
+    modules = ret.stdout.split()
+    return [m for m in modules if m.split('.')[0] in ('pygments', 'commonmark')]
+
+
+def test_cli_import_is_light():
+    assert heavy_modules("import consolemd.cli") == []
+
+
+def test_no_highlighting_without_code_blocks():
+    modules = heavy_modules(
+        "import io, consolemd\n"
+        "consolemd.Renderer().render('# hi\\n\\n*there*', output=io.StringIO())"
+    )
+    assert 'commonmark' in modules
+    assert 'pygments.lexers' not in modules
+    assert 'pygments.formatters' not in modules
+
+
+def import_time_ms(module):
+    ret = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+        check=True,
+    )
+    # import time: self [us] | cumulative | imported package
+    for line in ret.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\S+)$", line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000.0
+
+
+def test_import_time_budget():
+    # best of a few runs, the first one also warms the disk cache
+    elapsed = min(import_time_ms('consolemd.cli') for _ in range(3))
+    assert elapsed < budget_ms, "importing consolemd.cli took {:.1f}ms".format(elapsed)
+
+
+def test_plain_never_imports_pygments():
+    modules = heavy_modules(
+        "import io, consolemd\n"
+        "consolemd.Renderer().render('# hi\\n\\n```python\\nx = 1\\n```\\n', output=io.StringIO(), plain=True)"
+    )
+    assert 'commonmark' in modules
+    assert not [m for m in modules if m.startswith('pygments')]
+
+
+def test_plain_cli_never_imports_pygments():
+    modules = heavy_modules(
+        "import consolemd.cli\n"
+        "try:\n"
+        "    consolemd.cli.cli(['--plain', '--output', '/dev/null', 'README.md'])\n"
+        "except SystemExit:\n"
+        "    pass"
+    )
+    assert 'commonmark' in modules
+    assert not [m for m in modules if m.startswith('pygments')]
+
+
+def test_rendering_doesnt_import_asyncio():
+    ret = run(
+        "import io, sys, consolemd\n"
+        "consolemd.Renderer().render('# hi', output=io.StringIO())\n"
+        "print('asyncio' in sys.modules)"
+    )
+    assert ret.stdout.strip() == 'False'
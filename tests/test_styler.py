@@ -0,0 +1,19 @@
+from consolemd.styler import Style, Styler
+
+
+def test_styles_are_shared():
+    a = Styler(None, 'native').style
+    b = Styler(None, 'native').style
+    assert a is b
+    assert Style.cached('native', False) is not a
+    assert Style.cached('native', False).entering('link').true_color is False
+
+
+def test_heading_levels():
+    style = Style.cached('monokai', True)
+    h1, h2 = style.heading(1), style.heading(2)
+
+    assert h1 is style.entering('heading')
+    assert h2.bold and h2.fg != h1.fg
+    assert style.heading(2) is h2
+    assert style.heading(9).fg # deeper than markdown allows still works
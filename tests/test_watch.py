@@ -0,0 +1,28 @@
+import pytest
+
+from consolemd.watch import Watcher
+
+
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_watcher_sees_saves(tmp_path, use_inotify):
+    path = tmp_path / 'doc.md'
+    path.write_text('# one\n')
+
+    watcher = Watcher(str(path), use_inotify=use_inotify)
+    try:
+        assert watcher.read() == '# one\n'
+        assert not watcher.changed()
+        assert watcher.read() is None
+
+        # saved by renaming a new file over the old one
+        new = tmp_path / 'doc.md.tmp'
+        new.write_text('# two, longer\n')
+        new.replace(path)
+
+        (tmp_path / 'other.md').write_text('not watched')
+
+        assert watcher.changed()
+        assert not watcher.changed()
+        assert watcher.read() == '# two, longer\n'
+    finally:
+        watcher.close()
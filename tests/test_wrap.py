@@ -0,0 +1,51 @@
+import io
+
+from consolemd.wrap import LineWrapper, display_width
+
+
+class Stream(io.StringIO):
+
+    def end_block(self):
+        pass
+
+
+def wrap(text, width, indent=0):
+    out = Stream()
+    wrapper = LineWrapper(out, width)
+    wrapper.indent(indent)
+    wrapper.start()
+    wrapper.write(text)
+    wrapper.stop()
+    return out.getvalue()
+
+
+def test_display_width():
+    assert display_width("abc") == 3
+    assert display_width("\x1b[38;2;1;2;3mabc\x1b[39m") == 3
+    assert display_width("漢字") == 4
+    assert display_width("é") == 1
+
+
+def test_wrap():
+    assert wrap("aaa bbb ccc ddd", 7) == "aaa bbb\nccc ddd"
+    assert wrap("aaa  bbb\nccc ", 20) == "aaa  bbb\nccc"
+
+
+def test_escapes_take_no_room():
+    bold, reset = "\x1b[01m", "\x1b[00m"
+    text = "aaa {}bbb{} ccc".format(bold, reset)
+    assert wrap(text, 11) == text
+    assert wrap(text, 10) == "aaa {}bbb{}\nccc".format(bold, reset)
+    assert wrap(text, 5) == "aaa\n{}bbb{}\nccc".format(bold, reset)
+
+
+def test_wide_characters():
+    assert wrap("漢字 漢字 漢字", 10) == "漢字 漢字\n漢字"
+
+
+def test_indent():
+    assert wrap("aaa bbb ccc", 5, indent=2) == "aaa\n  bbb\n  ccc"
+
+
+def test_long_words_stay_whole():
+    assert wrap("aaaaaaaaaa bbb", 5) == "aaaaaaaaaa\nbbb"